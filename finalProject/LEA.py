@@ -2,6 +2,8 @@
 Lightweight Encryption Algorithm (LEA)
     by Michel Qu
 """
+import struct
+from collections import OrderedDict
 
 ### Test value for a 128-bit key
 plaintext128 = 0x101112131415161718191a1b1c1d1e1f
@@ -15,93 +17,29 @@ key192 = 0x0f1e2d3c4b5a69788796a5b4c3d2e1f0f0e1d2c3b4a59687
 plaintext256 = 0x303132333435363738393a3b3c3d3e3f
 key256 = 0x0f1e2d3c4b5a69788796a5b4c3d2e1f0f0e1d2c3b4a5968778695a4b3c2d1e0f
 
+### Official test vectors, as 32-bit words (the specification loads bytes little-endian)
+testVectors = [
+    (128, 0x3c2d1e0f78695a4bb4a59687f0e1d2c3,
+     0x13121110171615141b1a19181f1e1d1c, 0x354ec89f18c6c628a7c73255fd8b6404),
+    (192, 0x3c2d1e0f78695a4bb4a59687f0e1d2c3c3d2e1f08796a5b4,
+     0x23222120272625242b2a29282f2e2d2c, 0x325eb96f871bad5a35f5dc8cf2c67476),
+    (256, 0x3c2d1e0f78695a4bb4a59687f0e1d2c3c3d2e1f08796a5b44b5a69780f1e2d3c,
+     0x33323130373635343b3a39383f3e3d3c, 0xf6af51d6c189b147ca00893a97e1f927),
+]
+
 ### Constant values 
 deltaList = [0xc3efe9db,0x44626b02,0x79e27c8a,0x78df30ec,0x715ea49e,0xc785da0a,0xe04ef22a,0xe5c40957]
+### rotatedDelta[j][r] is deltaList[j] rotated left by r bits
+rotatedDelta = [[((delta << r) | (delta >> (32 - r))) & 0xffffffff for r in range(32)] for delta in deltaList]
 
 def conversion(key,keysize):
-    "Convert the 128-key in 4 32-bit block"
-    string = bin(key)
-    list1 = []
-    list1[:0]=string
-    list1 = list1[2:] 
-    
-    "For a 4/6/8 number of 32-bit block"
-    result = []
-    n = len(list1)
-    temp = ''
-    ### ------------------------------------
-    " 128-bit lenght key "
-    ### ------------------------------------
-    if(keysize == 128) : 
-        "4 blocks of 32-bit"
-        a = 128 - n  #number of zero to add
-        for i in range (a) :
-            temp = temp + '0'
-            if (len(temp) == 32) : 
-                result.append(int(temp,2))
-                temp = ''
-        for i in range (n) : 
-            temp = temp + list1[i]
-            if (len(temp) == 32) : 
-                result.append(int(temp,2))
-                temp = ''
-                
-
-    ### ------------------------------------
-    " 192-bit lenght key "
-    ### ------------------------------------
-    if(keysize == 192) : 
-        "5 blocks of 32-bit"
-        a = 192 - n  #number of zero to add
-        for i in range (a) :
-            temp = temp + '0'
-            if (len(temp) == 32) : 
-                result.append(int(temp,2))
-                temp = ''
-        for i in range (n) : 
-            temp = temp + list1[i]
-            if (len(temp) == 32) : 
-                result.append(int(temp,2))
-                temp = ''
-                
-                
-    ### ------------------------------------
-    " 256-bit lenght key "
-    ### ------------------------------------
-    if(keysize == 256) : 
-        "6 blocks of 32-bit"
-        a = 256 - n  #number of zero to add
-        for i in range (a) :
-            temp = temp + '0'
-            if (len(temp) == 32) : 
-                result.append(int(temp,2))
-                temp = ''
-        for i in range (n) : 
-            temp = temp + list1[i]
-            if (len(temp) == 32) : 
-                result.append(int(temp,2))
-                temp = ''
-    return result
+    "Convert a keysize-bit integer in keysize/32 blocks of 32-bit, most significant first"
+    n = keysize // 32
+    return list(struct.unpack(f'>{n}I', key.to_bytes(4 * n, 'big')))
 
 def deconversion(blockList) : 
     "Convert the 4 32-bit blocks in a 128-bit key"
-    a = bin(blockList[0])
-    b = bin(blockList[1])[2:] # Remove the '0b'
-    c = bin(blockList[2])[2:] # Remove the '0b'
-    d = bin(blockList[3])[2:] # Remove the '0b'
-    
-    # We assure that the four block are 32-bit lenght
-    while len(b) < 32 : 
-        b = '0'+b
-    while len(c) < 32 : 
-        c = '0'+c
-    while len(d) < 32 : 
-        d = '0'+d
-    
-    # We concatenate the four blocks into one 128-bit lenght block
-    result = a+b+c+d
-    result = int(result,2)
-    return result
+    return int.from_bytes(struct.pack('>4I', *blockList), 'big')
 
 def roundKeyGeneration(key,keysize):
     "This function generates the list of roundKeys"
@@ -112,10 +50,10 @@ def roundKeyGeneration(key,keysize):
         n_round = 24
         T = conversion(key,keysize)
         for i in range (n_round) :
-            T[0] = bitwiseRotation(modularAddition(T[0], bitwiseRotation(deltaList[i%4],-1,i)),-1,1)
-            T[1] = bitwiseRotation(modularAddition(T[1], bitwiseRotation(deltaList[i%4],-1,i+1)),-1,3)
-            T[2] = bitwiseRotation(modularAddition(T[2], bitwiseRotation(deltaList[i%4],-1,i+2)),-1,6)
-            T[3] = bitwiseRotation(modularAddition(T[3], bitwiseRotation(deltaList[i%4],-1,i+3)),-1,11)
+            T[0] = bitwiseRotation(modularAddition(T[0], rotatedDelta[i%4][i]),-1,1)
+            T[1] = bitwiseRotation(modularAddition(T[1], rotatedDelta[i%4][i+1]),-1,3)
+            T[2] = bitwiseRotation(modularAddition(T[2], rotatedDelta[i%4][i+2]),-1,6)
+            T[3] = bitwiseRotation(modularAddition(T[3], rotatedDelta[i%4][i+3]),-1,11)
             temp = [T[0],T[1],T[2],T[1],T[3],T[1]]
             K.append(temp)
     "Key-schedule for LEA-192"
@@ -123,12 +61,12 @@ def roundKeyGeneration(key,keysize):
         n_round = 28
         T = conversion(key,keysize)
         for i in range (n_round) : 
-            T[0] = bitwiseRotation(modularAddition(T[0], bitwiseRotation(deltaList[i%6],-1,i)),-1,1)
-            T[1] = bitwiseRotation(modularAddition(T[1], bitwiseRotation(deltaList[i%6],-1,i+1)),-1,3)
-            T[2] = bitwiseRotation(modularAddition(T[2], bitwiseRotation(deltaList[i%6],-1,i+2)),-1,6)
-            T[3] = bitwiseRotation(modularAddition(T[3], bitwiseRotation(deltaList[i%6],-1,i+3)),-1,11)
-            T[4] = bitwiseRotation(modularAddition(T[4], bitwiseRotation(deltaList[i%6],-1,i+4)),-1,13)
-            T[5] = bitwiseRotation(modularAddition(T[5], bitwiseRotation(deltaList[i%6],-1,(i+5)%32)),-1,17)
+            T[0] = bitwiseRotation(modularAddition(T[0], rotatedDelta[i%6][i]),-1,1)
+            T[1] = bitwiseRotation(modularAddition(T[1], rotatedDelta[i%6][i+1]),-1,3)
+            T[2] = bitwiseRotation(modularAddition(T[2], rotatedDelta[i%6][i+2]),-1,6)
+            T[3] = bitwiseRotation(modularAddition(T[3], rotatedDelta[i%6][i+3]),-1,11)
+            T[4] = bitwiseRotation(modularAddition(T[4], rotatedDelta[i%6][i+4]),-1,13)
+            T[5] = bitwiseRotation(modularAddition(T[5], rotatedDelta[i%6][(i+5)%32]),-1,17)
             temp = [T[0],T[1],T[2],T[3],T[4],T[5]]
             K.append(temp)
     "Key-schedule for LEA-256"
@@ -136,21 +74,36 @@ def roundKeyGeneration(key,keysize):
         n_round = 32
         T = conversion(key,keysize)
         for i in range (n_round) : 
-            T[(6*i)%8] = bitwiseRotation(modularAddition(T[(6*i)%8], bitwiseRotation(deltaList[i%8],-1,i%32)),-1,1)
-            T[((6*i)+1)%8] = bitwiseRotation(modularAddition(T[((6*i)+1)%8], bitwiseRotation(deltaList[i%8],-1,(i+1)%32)),-1,3)
-            T[((6*i)+2)%8] = bitwiseRotation(modularAddition(T[((6*i)+2)%8], bitwiseRotation(deltaList[i%8],-1,(i+2)%32)),-1,6)
-            T[((6*i)+3)%8] = bitwiseRotation(modularAddition(T[((6*i)+3)%8], bitwiseRotation(deltaList[i%8],-1,(i+3)%32)),-1,11)
-            T[((6*i)+4)%8] = bitwiseRotation(modularAddition(T[((6*i)+4)%8], bitwiseRotation(deltaList[i%8],-1,(i+4)%32)),-1,13)
-            T[((6*i)+5)%8] = bitwiseRotation(modularAddition(T[((6*i)+5)%8], bitwiseRotation(deltaList[i%8],-1,(i+5)%32)),-1,17)
+            T[(6*i)%8] = bitwiseRotation(modularAddition(T[(6*i)%8], rotatedDelta[i%8][i%32]),-1,1)
+            T[((6*i)+1)%8] = bitwiseRotation(modularAddition(T[((6*i)+1)%8], rotatedDelta[i%8][(i+1)%32]),-1,3)
+            T[((6*i)+2)%8] = bitwiseRotation(modularAddition(T[((6*i)+2)%8], rotatedDelta[i%8][(i+2)%32]),-1,6)
+            T[((6*i)+3)%8] = bitwiseRotation(modularAddition(T[((6*i)+3)%8], rotatedDelta[i%8][(i+3)%32]),-1,11)
+            T[((6*i)+4)%8] = bitwiseRotation(modularAddition(T[((6*i)+4)%8], rotatedDelta[i%8][(i+4)%32]),-1,13)
+            T[((6*i)+5)%8] = bitwiseRotation(modularAddition(T[((6*i)+5)%8], rotatedDelta[i%8][(i+5)%32]),-1,17)
             temp = [T[(6*i)%8],T[((6*i)+1)%8],T[((6*i)+2)%8],T[((6*i)+3)%8],T[((6*i)+4)%8],T[((6*i)+5)%8]]
             K.append(temp)
     return (K)
     
-def encryption(plaintext,key,keysize) : 
-    "This function encrypts the plaintext with the key"
-    X = conversion(plaintext,128) # The plaintext is always 128-bit
-    K = roundKeyGeneration(key,keysize) # Generates all the roundkey associated to the key lenght
-    #print(f'The lenght of Roundkey is : {len(K)}')
+### Expanded keys of the last keyCacheSize keys used
+keyCacheSize = 128
+keyCache = OrderedDict()
+
+def expandKey(key,keysize) :
+    "Returns the round keys of the key, from a bounded LRU cache shared by all the calls"
+    if keysize not in (128,192,256) :
+        raise ValueError(f"LEA keys are 128, 192 or 256 bits long, not {keysize}.")
+    entry = (key,keysize)
+    if entry in keyCache :
+        keyCache.move_to_end(entry)
+        return keyCache[entry]
+    K = tuple(tuple(roundKey) for roundKey in roundKeyGeneration(key,keysize))
+    keyCache[entry] = K
+    if len(keyCache) > keyCacheSize :
+        keyCache.popitem(last=False)
+    return K
+
+def encryptWords(X,K) : 
+    "This function encrypts a block of 4 32-bit words with the round keys K"
     Nr = len(K)
     for i in range(Nr) : 
         temp = []
@@ -159,13 +112,10 @@ def encryption(plaintext,key,keysize) :
         temp.append( bitwiseRotation(modularAddition(bitwiseXOR(X[2],K[i][4]),bitwiseXOR(X[3],K[i][5])),1,3) )
         temp.append( X[0] )
         X = temp
-    C = deconversion(X) # Rebuild a 128-bit ciphertext
-    return(C)
+    return X
 
-def decryption(ciphertext,key,keysize) : 
-    "This function decrypts the ciphertext with the key"
-    X = conversion(ciphertext,128) # The ciphertext is always 128-bit
-    K = roundKeyGeneration(key,keysize) # Generates all the roundkey associated to the key lenght
+def decryptWords(X,K) : 
+    "This function decrypts a block of 4 32-bit words with the round keys K"
     Nr = len(K)
     for i in range (Nr-1,-1,-1) : 
         temp = []
@@ -174,9 +124,53 @@ def decryption(ciphertext,key,keysize) :
         temp.append( bitwiseXOR(modularDifference(bitwiseRotation(X[1],-1,5),bitwiseXOR(temp[1],K[i][2])), K[i][3]))
         temp.append( bitwiseXOR(modularDifference(bitwiseRotation(X[2],-1,3),bitwiseXOR(temp[2],K[i][4])), K[i][5]))
         X = temp
-    P = deconversion(X) # Rebuild a 128-bit plaintext
+    return X
+
+def encryption(plaintext,key,keysize) : 
+    "This function encrypts the plaintext with the key"
+    X = conversion(plaintext,128) # The plaintext is always 128-bit
+    K = expandKey(key,keysize) # The roundkeys associated to the key lenght, computed once per key
+    C = deconversion(encryptWords(X,K)) # Rebuild a 128-bit ciphertext
+    return(C)
+
+def decryption(ciphertext,key,keysize) : 
+    "This function decrypts the ciphertext with the key"
+    X = conversion(ciphertext,128) # The ciphertext is always 128-bit
+    K = expandKey(key,keysize)
+    P = deconversion(decryptWords(X,K)) # Rebuild a 128-bit plaintext
     return (P)
-        
+
+class LEA :
+    "LEA cipher for one key, its round keys are expanded once"
+
+    def __init__(self,key,keysize) :
+        if keysize not in (128,192,256) :
+            raise ValueError(f"LEA keys are 128, 192 or 256 bits long, not {keysize}.")
+        self.keysize = keysize
+        self.roundKeys = expandKey(key,keysize)
+
+    def encryptBlock(self,plaintext) :
+        "Encrypt a 128-bit integer"
+        return deconversion(encryptWords(conversion(plaintext,128),self.roundKeys))
+
+    def decryptBlock(self,ciphertext) :
+        "Decrypt a 128-bit integer"
+        return deconversion(decryptWords(conversion(ciphertext,128),self.roundKeys))
+
+    def encryptBuffer(self,data) :
+        "Encrypt bytes in ECB mode, the words of each 16-byte block are little-endian as in the specification"
+        return self._buffer(data,encryptWords)
+
+    def decryptBuffer(self,data) :
+        "Decrypt bytes in ECB mode"
+        return self._buffer(data,decryptWords)
+
+    def _buffer(self,data,function) :
+        if len(data) % 16 :
+            raise ValueError(f"The buffer length {len(data)} is not a multiple of 16.")
+        return b''.join(struct.pack('<4I', *function(list(words),self.roundKeys))
+                        for words in struct.iter_unpack('<4I', data))
+
 def bitwiseXOR(blockA,blockB) :
     "This function makes a bitwise XOR on a 32-bit block"
     return (blockA^blockB)
@@ -195,12 +189,12 @@ def bitwiseRotation(block,rotation,number) :
 
 def modularAddition(blockA,blockB) :
     "This function makes a modular addition on a 32-bit block"
-    block = (blockA + blockB) % (0xffffffff)
+    block = (blockA + blockB) & 0xffffffff
     return (block)
 
 def modularDifference(blockA,blockB) :
     "This function makes a modular difference on a 32-bit block"
-    block = (blockA - blockB) % (0xffffffff)
+    block = (blockA - blockB) & 0xffffffff
     return (block)
 
 def rotate_right(x, n):
@@ -243,6 +237,25 @@ def test () :
     print(f'The encryption for plaintext256 by key256 gives c = {c}')
     print(f'The decryption of the ciphertext gives m = {m}')
     print(f'We verify if m = plaintext256 : {m == plaintext256}')
+    
+    "Official test vectors"
+    print('----------------------')
+    for keysize, key, plaintext, ciphertext in testVectors :
+        c = encryption(plaintext,key,keysize)
+        print(f'LEA-{keysize} test vector : {c == ciphertext and decryption(c,key,keysize) == plaintext}')
+    cipher = LEA(0x3c2d1e0f78695a4bb4a59687f0e1d2c3,128)
+    c = cipher.encryptBuffer(bytes.fromhex('101112131415161718191a1b1c1d1e1f') * 2)
+    print(f'LEA-128 test vector on a buffer : {c.hex() == "9fc84e3528c6c6185532c7a704648bfd" * 2 and cipher.decryptBuffer(c) == bytes.fromhex("101112131415161718191a1b1c1d1e1f") * 2}')
+
+    "Other key sizes are rejected instead of giving no rounds"
+    rejected = 0
+    for keysize in (0, 64, 100, 120, 512) :
+        for function in (lambda: encryption(plaintext128,key128,keysize), lambda: LEA(key128,keysize)) :
+            try :
+                function()
+            except ValueError :
+                rejected += 1
+    print(f'Other key sizes are rejected : {rejected == 10}')
     return 0
 
 if __name__ == "__main__":
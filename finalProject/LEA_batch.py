@@ -0,0 +1,146 @@
+"""Batched LEA with NumPy, runs the ARX rounds on (N, 4) uint32 arrays of blocks at once.
+
+Blocks use the word order of LEA.py: word 0 is the most significant word
+of the 128-bit integer. Byte buffers are loaded as in the specification,
+each word being 4 bytes in little-endian order.
+"""
+import struct
+from typing import Tuple
+import numpy as np
+
+import LEA
+
+# Specification test vectors as bytes: key, plaintext, ciphertext.
+BYTE_TEST_VECTORS = [
+    ("0f1e2d3c4b5a69788796a5b4c3d2e1f0",
+     "101112131415161718191a1b1c1d1e1f", "9fc84e3528c6c6185532c7a704648bfd"),
+    ("0f1e2d3c4b5a69788796a5b4c3d2e1f0f0e1d2c3b4a59687",
+     "202122232425262728292a2b2c2d2e2f", "6fb95e325aad1b878cdcf5357674c6f2"),
+    ("0f1e2d3c4b5a69788796a5b4c3d2e1f0f0e1d2c3b4a5968778695a4b3c2d1e0f",
+     "303132333435363738393a3b3c3d3e3f", "d651aff647b189c13a8900ca27f9e197"),
+]
+
+
+def round_keys_array(key: int, keysize: int) -> np.ndarray:
+    """Returns the (rounds, 6) round keys of key."""
+    if keysize not in (128, 192, 256):
+        raise ValueError(f"LEA keys are 128, 192 or 256 bits long, not {keysize}.")
+    return np.array(LEA.expandKey(key, keysize), dtype=np.uint32)
+
+
+def rotate_left(words: np.ndarray, n: int) -> np.ndarray:
+    """Rotate every uint32 word left by n bits, 0 < n < 32."""
+    return (words << np.uint32(n)) | (words >> np.uint32(32 - n))
+
+
+def encrypt_blocks(blocks, round_keys: np.ndarray) -> np.ndarray:
+    """Encrypt (N, 4) uint32 blocks, bit exact with LEA.encryption."""
+    blocks = np.asarray(blocks, dtype=np.uint32).reshape(-1, 4)
+    x_0, x_1, x_2, x_3 = (blocks[:, i].copy() for i in range(4))
+    for k_0, k_1, k_2, k_3, k_4, k_5 in round_keys:
+        x_0, x_1, x_2, x_3 = (
+            rotate_left((x_0 ^ k_0) + (x_1 ^ k_1), 9),
+            rotate_left((x_1 ^ k_2) + (x_2 ^ k_3), 27),
+            rotate_left((x_2 ^ k_4) + (x_3 ^ k_5), 29),
+            x_0,
+        )
+    return np.stack([x_0, x_1, x_2, x_3], axis=1)
+
+
+def decrypt_blocks(blocks, round_keys: np.ndarray) -> np.ndarray:
+    """Decrypt (N, 4) uint32 blocks, bit exact with LEA.decryption."""
+    blocks = np.asarray(blocks, dtype=np.uint32).reshape(-1, 4)
+    x_0, x_1, x_2, x_3 = (blocks[:, i].copy() for i in range(4))
+    for k_0, k_1, k_2, k_3, k_4, k_5 in round_keys[::-1]:
+        y_1 = (rotate_left(x_0, 23) - (x_3 ^ k_0)) ^ k_1
+        y_2 = (rotate_left(x_1, 5) - (y_1 ^ k_2)) ^ k_3
+        y_3 = (rotate_left(x_2, 3) - (y_2 ^ k_4)) ^ k_5
+        x_0, x_1, x_2, x_3 = x_3, y_1, y_2, y_3
+    return np.stack([x_0, x_1, x_2, x_3], axis=1)
+
+
+def key_from_bytes(key: bytes) -> Tuple[int, int]:
+    """The integer key and keysize of LEA.py for a 16, 24 or 32 byte key."""
+    if len(key) not in (16, 24, 32):
+        raise ValueError(f"LEA keys are 16, 24 or 32 bytes long, not {len(key)}.")
+    n = len(key) // 4
+    return int.from_bytes(struct.pack(f'>{n}I', *struct.unpack(f'<{n}I', key)), 'big'), 8 * len(key)
+
+
+def bytes_to_blocks(data: bytes) -> np.ndarray:
+    """Load a buffer of 16 byte blocks as (N, 4) uint32 words."""
+    if len(data) % 16:
+        raise ValueError(f"The buffer length {len(data)} is not a multiple of 16.")
+    return np.frombuffer(data, dtype='<u4').astype(np.uint32).reshape(-1, 4)
+
+
+def blocks_to_bytes(blocks: np.ndarray) -> bytes:
+    """Store (N, 4) uint32 blocks in a buffer."""
+    return blocks.astype('<u4').tobytes()
+
+
+def ecb_encrypt(data: bytes, key: bytes) -> bytes:
+    """Encrypt a buffer in ECB mode, its length must be a multiple of 16."""
+    return blocks_to_bytes(encrypt_blocks(bytes_to_blocks(data), round_keys_array(*key_from_bytes(key))))
+
+
+def ecb_decrypt(data: bytes, key: bytes) -> bytes:
+    """Decrypt a buffer in ECB mode, its length must be a multiple of 16."""
+    return blocks_to_bytes(decrypt_blocks(bytes_to_blocks(data), round_keys_array(*key_from_bytes(key))))
+
+
+def counter_blocks(nonce: bytes, n_blocks: int) -> np.ndarray:
+    """The n_blocks counter blocks from the 16 byte big-endian counter nonce, modulo 2^128."""
+    high, low = struct.unpack('>QQ', nonce)
+    lows = np.uint64(low) + np.arange(n_blocks, dtype=np.uint64)
+    highs = np.uint64(high) + (lows < np.uint64(low)).astype(np.uint64)
+    return bytes_to_blocks(np.stack([highs, lows], axis=1).astype('>u8').tobytes())
+
+
+def ctr(data: bytes, key: bytes, nonce: bytes) -> bytes:
+    """Encrypt or decrypt a buffer of any length in CTR mode."""
+    n_blocks = -(-len(data) // 16)
+    stream = blocks_to_bytes(encrypt_blocks(counter_blocks(nonce, n_blocks),
+                                            round_keys_array(*key_from_bytes(key))))
+    data = np.frombuffer(data, dtype=np.uint8)
+    return (data ^ np.frombuffer(stream, dtype=np.uint8)[:len(data)]).tobytes()
+
+
+def main():
+    """Check the batch against LEA.encryption/decryption and the specification test vectors."""
+    for keysize, key, plaintext, ciphertext in LEA.testVectors:
+        blocks = np.array([LEA.conversion(plaintext, 128)], dtype=np.uint32)
+        assert LEA.deconversion(encrypt_blocks(blocks, round_keys_array(key, keysize))[0].tolist()) == ciphertext
+        assert LEA.deconversion(decrypt_blocks(LEA.conversion(ciphertext, 128),
+                                               round_keys_array(key, keysize))[0].tolist()) == plaintext
+    for key, plaintext, ciphertext in BYTE_TEST_VECTORS:
+        key, plaintext, ciphertext = bytes.fromhex(key), bytes.fromhex(plaintext), bytes.fromhex(ciphertext)
+        assert ecb_encrypt(plaintext, key) == ciphertext
+        assert ecb_decrypt(ciphertext, key) == plaintext
+    rng = np.random.default_rng(0)
+    for keysize in (128, 192, 256):
+        key = int.from_bytes(rng.bytes(keysize // 8), 'big')
+        plaintexts = [int.from_bytes(rng.bytes(16), 'big') for _ in range(32)]
+        blocks = np.array([LEA.conversion(plaintext, 128) for plaintext in plaintexts], dtype=np.uint32)
+        ciphertexts = encrypt_blocks(blocks, round_keys_array(key, keysize)).tolist()
+        assert [LEA.deconversion(c) for c in ciphertexts] == [LEA.encryption(p, key, keysize) for p in plaintexts]
+        decrypted = decrypt_blocks(ciphertexts, round_keys_array(key, keysize)).tolist()
+        assert [LEA.deconversion(p) for p in decrypted] == plaintexts == \
+            [LEA.decryption(LEA.deconversion(c), key, keysize) for c in ciphertexts]
+    for keysize in (0, 64, 100):
+        try:
+            round_keys_array(LEA.key128, keysize)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"a {keysize}-bit key must be rejected")
+    # CTR is its own inverse, and its counter carries into the high half.
+    key, message = rng.bytes(16), rng.bytes(100)
+    nonce = bytes(8) + b'\xff' * 8
+    assert ctr(ctr(message, key, nonce), key, nonce) == message
+    assert blocks_to_bytes(counter_blocks(nonce, 2))[16:] == (1 << 64).to_bytes(16, 'big')
+    assert ctr(bytes(16), key, nonce) == ecb_encrypt(nonce, key)
+
+
+if __name__ == "__main__":
+    main()
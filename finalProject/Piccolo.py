@@ -1,3 +1,6 @@
+import struct
+from array import array
+
 Sbox = [0xe, 0x4, 0xb, 0x2, 0x3, 0x8, 0x0, 0x9, 0x1, 0xa, 0x7, 0xf, 0x6, 0xc, 0x5, 0xd]
 
 M = [
@@ -9,6 +12,11 @@ M = [
 
 
 def decrypt(Y, wk, rk):
+    return G(Y, *decryption_keys(wk, rk))
+
+
+def decryption_keys(wk, rk):
+    """The whitening and round keys that make G decrypt."""
     wktemp = [0, 0, 0, 0]
     wktemp[0] = wk[2]
     wktemp[1] = wk[3]
@@ -25,7 +33,7 @@ def decrypt(Y, wk, rk):
             rktemp_2 = rk[len(rk) - 2 * i - 2]
         rknew.append(rktemp_1)
         rknew.append(rktemp_2)
-    return G(Y, wk, rknew)
+    return wk, rknew
 
 
 def G(X, wk, rk):
@@ -44,12 +52,12 @@ def G(X, wk, rk):
     number_rounds = len(rk) // 2
 
     for i in range(number_rounds - 1):
-        Xarr[1] = Xarr[1] ^ f(Xarr[0]) ^ rk[2 * i]
-        Xarr[3] = Xarr[3] ^ f(Xarr[2]) ^ rk[2 * i + 1]
+        Xarr[1] = Xarr[1] ^ F_TABLE[Xarr[0]] ^ rk[2 * i]
+        Xarr[3] = Xarr[3] ^ F_TABLE[Xarr[2]] ^ rk[2 * i + 1]
         Xarr = permutation(Xarr)
 
-    Xarr[1] = Xarr[1] ^ f(Xarr[0]) ^ rk[len(rk) - 2]
-    Xarr[3] = Xarr[3] ^ f(Xarr[2]) ^ rk[len(rk) - 1]
+    Xarr[1] = Xarr[1] ^ F_TABLE[Xarr[0]] ^ rk[len(rk) - 2]
+    Xarr[3] = Xarr[3] ^ F_TABLE[Xarr[2]] ^ rk[len(rk) - 1]
     Xarr[0] = Xarr[0] ^ wk[2]
     Xarr[2] = Xarr[2] ^ wk[3]
 
@@ -67,7 +75,8 @@ def f(b):
         X.append(Sbox[ind])
 
     for i in range(4):
-        Y[i] = (gf(X[0], M[i][0]) ^ gf(X[1], M[i][1]) ^ gf(X[2], M[i][2]) ^ gf(X[3], M[i][3]))
+        Y[i] = (GF_TABLE[X[0]][M[i][0]] ^ GF_TABLE[X[1]][M[i][1]]
+                ^ GF_TABLE[X[2]][M[i][2]] ^ GF_TABLE[X[3]][M[i][3]])
         ret.append(Sbox[Y[i]])
 
     return (ret[0] << 12) ^ (ret[1] << 8) ^ (ret[2] << 4) ^ ret[3]
@@ -85,6 +94,32 @@ def gf(a, b):
     return retval
 
 
+# GF_TABLE[a][b] = gf(a, b)
+GF_TABLE = [[gf(a, b) for b in range(16)] for a in range(16)]
+
+
+def f_table():
+    """f on all the 16-bit inputs.
+
+    The product by M is the XOR of the columns of M, each multiplied by
+    one nibble, so it is precomputed per nibble position.
+    """
+    columns = [[(GF_TABLE[Sbox[x]][M[0][j]] << 12) ^ (GF_TABLE[Sbox[x]][M[1][j]] << 8)
+                ^ (GF_TABLE[Sbox[x]][M[2][j]] << 4) ^ GF_TABLE[Sbox[x]][M[3][j]]
+                for x in range(16)] for j in range(4)]
+    sbox8 = [(Sbox[y >> 4] << 4) ^ Sbox[y & 0xF] for y in range(256)]
+    c_0, c_1, c_2, c_3 = columns
+    table = array('H')
+    for b in range(65536):
+        y = c_0[b >> 12] ^ c_1[(b >> 8) & 0xF] ^ c_2[(b >> 4) & 0xF] ^ c_3[b & 0xF]
+        table.append((sbox8[y >> 8] << 8) ^ sbox8[y & 0xFF])
+    return table
+
+
+# F_TABLE[b] = f(b)
+F_TABLE = f_table()
+
+
 def permutation(input):
     X = []
     Y = [0, 0, 0, 0, 0, 0, 0, 0]
@@ -189,6 +224,43 @@ def keyschedule128bit(key):
     return rk, wk
 
 
+class Piccolo:
+    """Piccolo with the encryption and decryption keys of an 80 or 128-bit key built once."""
+
+    def __init__(self, key, keysize=128):
+        if keysize == 80:
+            rk, wk = keyschedule80bit(key)
+        elif keysize == 128:
+            rk, wk = keyschedule128bit(key)
+        else:
+            raise ValueError(f"Piccolo keys are 80 or 128 bits long, not {keysize}.")
+        self.wk, self.rk = array('H', wk), array('H', rk)
+        decryption_wk, decryption_rk = decryption_keys(wk, rk)
+        self.decryption_wk, self.decryption_rk = array('H', decryption_wk), array('H', decryption_rk)
+
+    def encrypt_block(self, X):
+        """Encrypt a 64-bit integer."""
+        return G(X, self.wk, self.rk)
+
+    def decrypt_block(self, Y):
+        """Decrypt a 64-bit integer."""
+        return G(Y, self.decryption_wk, self.decryption_rk)
+
+    def encrypt(self, data):
+        """Encrypt bytes in ECB mode, as big-endian 8 byte blocks."""
+        return self._buffer(data, self.encrypt_block)
+
+    def decrypt(self, data):
+        """Decrypt bytes in ECB mode."""
+        return self._buffer(data, self.decrypt_block)
+
+    @staticmethod
+    def _buffer(data, function):
+        if len(data) % 8:
+            raise ValueError(f"The buffer length {len(data)} is not a multiple of 8.")
+        return b''.join(struct.pack('>Q', function(block)) for block, in struct.iter_unpack('>Q', data))
+
+
 if __name__ == "__main__":
     key128 = 0x00112233445566778899aabbccddeeff
     key80 = 0x0123456789abcdef
@@ -199,5 +271,13 @@ if __name__ == "__main__":
     cipher80 = G(msg, wk80, rk80)
     decipher128 = decrypt(cipher128, wk128, rk128)
     decipher80 = decrypt(cipher80, wk80, rk80)
+    assert all(F_TABLE[b] == f(b) for b in range(65536))
+    # Test vectors of the Piccolo paper.
+    assert G(msg, *reversed(keyschedule80bit(0x00112233445566778899))) == 0x8d2bff9935f84056
+    assert G(msg, wk128, rk128) == 0x5ec42cea657b89ff
+    cipher = Piccolo(key128)
+    assert cipher.encrypt_block(msg) == cipher128 and cipher.decrypt_block(cipher128) == msg
+    assert Piccolo(key80, 80).decrypt(Piccolo(key80, 80).encrypt(bytes(range(32)))) == bytes(range(32))
+    assert cipher.encrypt(msg.to_bytes(8, 'big') * 2) == cipher128.to_bytes(8, 'big') * 2
     if decipher128 == msg and decipher80 == msg:
         print("correct")
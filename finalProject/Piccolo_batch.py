@@ -0,0 +1,135 @@
+"""Batched Piccolo with NumPy, works on arrays of 64-bit blocks at once.
+
+Blocks are either (N,) uint64 or (N, 4) uint16 arrays, word 0 being the
+most significant 16 bits as in Piccolo.G. Byte buffers hold big-endian
+8 byte blocks.
+"""
+import struct
+from typing import List, Tuple
+import numpy as np
+
+import Piccolo
+
+F_TABLE = np.frombuffer(Piccolo.F_TABLE, dtype=np.uint16)
+KEY_SCHEDULES = {80: Piccolo.keyschedule80bit, 128: Piccolo.keyschedule128bit}
+
+
+def key_schedule(key: int, keysize: int) -> Tuple[List[int], List[int]]:
+    """The (wk, rk) encryption keys of an 80 or 128-bit key."""
+    if keysize not in KEY_SCHEDULES:
+        raise ValueError(f"Piccolo keys are 80 or 128 bits long, not {keysize}.")
+    rk, wk = KEY_SCHEDULES[keysize](key)
+    return wk, rk
+
+
+def to_words(blocks) -> np.ndarray:
+    """(N, 4) uint16 words of (N,) uint64 blocks, (N, 4) arrays are returned as uint16."""
+    blocks = np.asarray(blocks)
+    if blocks.ndim == 2:
+        return blocks.astype(np.uint16)
+    blocks = blocks.astype(np.uint64)
+    return np.stack([(blocks >> np.uint64(48 - 16 * i)).astype(np.uint16) for i in range(4)], axis=1)
+
+
+def from_words(words: np.ndarray) -> np.ndarray:
+    """(N,) uint64 blocks of (N, 4) uint16 words."""
+    words = words.astype(np.uint64)
+    return ((words[:, 0] << np.uint64(48)) | (words[:, 1] << np.uint64(32))
+            | (words[:, 2] << np.uint64(16)) | words[:, 3])
+
+
+def G(words: np.ndarray, wk: List[int], rk: List[int]) -> np.ndarray:
+    """Piccolo.G on (N, 4) uint16 words."""
+    wk = np.array(wk, dtype=np.uint16)
+    rk = np.array(rk, dtype=np.uint16)
+    x_0, x_2 = words[:, 0] ^ wk[0], words[:, 2] ^ wk[1]
+    x_1, x_3 = words[:, 1].copy(), words[:, 3].copy()
+    high, low = np.uint16(0xFF00), np.uint16(0x00FF)
+    for i in range(len(rk) // 2 - 1):
+        x_1 ^= F_TABLE[x_0] ^ rk[2 * i]
+        x_3 ^= F_TABLE[x_2] ^ rk[2 * i + 1]
+        # Round permutation, bytes (0..7) -> (2, 7, 4, 1, 6, 3, 0, 5)
+        x_0, x_1, x_2, x_3 = ((x_1 & high) | (x_3 & low), (x_2 & high) | (x_0 & low),
+                              (x_3 & high) | (x_1 & low), (x_0 & high) | (x_2 & low))
+    x_1 ^= F_TABLE[x_0] ^ rk[-2]
+    x_3 ^= F_TABLE[x_2] ^ rk[-1]
+    return np.stack([x_0 ^ wk[2], x_1, x_2 ^ wk[3], x_3], axis=1)
+
+
+def encrypt_blocks(blocks, key: int, keysize: int) -> np.ndarray:
+    """Encrypt (N,) uint64 or (N, 4) uint16 blocks, the result has the same shape."""
+    wk, rk = key_schedule(key, keysize)
+    words = G(to_words(blocks), wk, rk)
+    return words if np.ndim(blocks) == 2 else from_words(words)
+
+
+def decrypt_blocks(blocks, key: int, keysize: int) -> np.ndarray:
+    """Decrypt (N,) uint64 or (N, 4) uint16 blocks, the result has the same shape."""
+    wk, rk = Piccolo.decryption_keys(*key_schedule(key, keysize))
+    words = G(to_words(blocks), wk, rk)
+    return words if np.ndim(blocks) == 2 else from_words(words)
+
+
+def key_from_bytes(key: bytes) -> Tuple[int, int]:
+    """The integer key and keysize of a 10 or 16 byte key."""
+    return int.from_bytes(key, 'big'), 8 * len(key)
+
+
+def bytes_to_words(data: bytes) -> np.ndarray:
+    """Load a buffer of 8 byte blocks as (N, 4) uint16 words."""
+    if len(data) % 8:
+        raise ValueError(f"The buffer length {len(data)} is not a multiple of 8.")
+    return np.frombuffer(data, dtype='>u2').astype(np.uint16).reshape(-1, 4)
+
+
+def words_to_bytes(words: np.ndarray) -> bytes:
+    """Store (N, 4) uint16 words in a buffer."""
+    return words.astype('>u2').tobytes()
+
+
+def ecb_encrypt(data: bytes, key: bytes) -> bytes:
+    """Encrypt a buffer in ECB mode, its length must be a multiple of 8."""
+    return words_to_bytes(encrypt_blocks(bytes_to_words(data), *key_from_bytes(key)))
+
+
+def ecb_decrypt(data: bytes, key: bytes) -> bytes:
+    """Decrypt a buffer in ECB mode, its length must be a multiple of 8."""
+    return words_to_bytes(decrypt_blocks(bytes_to_words(data), *key_from_bytes(key)))
+
+
+def ctr(data: bytes, key: bytes, nonce: bytes) -> bytes:
+    """Encrypt or decrypt a buffer of any length in CTR mode, from the 8 byte big-endian counter nonce."""
+    counter, = struct.unpack('>Q', nonce)
+    counters = np.uint64(counter) + np.arange(-(-len(data) // 8), dtype=np.uint64)
+    stream = words_to_bytes(encrypt_blocks(to_words(counters), *key_from_bytes(key)))
+    data = np.frombuffer(data, dtype=np.uint8)
+    return (data ^ np.frombuffer(stream, dtype=np.uint8)[:len(data)]).tobytes()
+
+
+def main():
+    """Check the batch against the test vectors and Piccolo.G."""
+    msg = 0x0123456789abcdef
+    vectors = [(0x00112233445566778899aabbccddeeff, 128, 0x5ec42cea657b89ff),
+               (0x00112233445566778899, 80, 0x8d2bff9935f84056)]
+    for key, keysize, ciphertext in vectors:
+        assert encrypt_blocks(np.array([msg], dtype=np.uint64), key, keysize).tolist() == [ciphertext]
+        assert decrypt_blocks(np.array([ciphertext], dtype=np.uint64), key, keysize).tolist() == [msg]
+        assert ecb_encrypt(msg.to_bytes(8, 'big'), key.to_bytes(keysize // 8, 'big')) == ciphertext.to_bytes(8, 'big')
+    # The vectors of Piccolo.__main__, and random blocks.
+    rng = np.random.default_rng(0)
+    blocks = np.concatenate([[msg], rng.integers(0, 2**63, 63)]).astype(np.uint64)
+    for key, keysize in ((0x00112233445566778899aabbccddeeff, 128), (0x0123456789abcdef, 80)):
+        wk, rk = key_schedule(key, keysize)
+        expected = np.array([Piccolo.G(int(block), wk, rk) for block in blocks], dtype=np.uint64)
+        assert (encrypt_blocks(blocks, key, keysize) == expected).all()
+        assert (encrypt_blocks(to_words(blocks), key, keysize) == to_words(expected)).all()
+        assert (decrypt_blocks(expected, key, keysize) == blocks).all()
+    key, message = rng.bytes(16), rng.bytes(100)
+    nonce = b'\xff' * 8
+    assert ctr(ctr(message, key, nonce), key, nonce) == message
+    assert ecb_decrypt(ecb_encrypt(message[:96], key), key) == message[:96]
+    assert ctr(bytes(16), key, nonce) == ecb_encrypt(nonce + bytes(8), key)
+
+
+if __name__ == "__main__":
+    main()
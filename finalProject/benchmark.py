@@ -0,0 +1,135 @@
+"""Throughput of the scalar and batched ciphers of finalProject, in blocks per second."""
+from time import perf_counter
+import numpy as np
+
+import LEA
+import LEA_batch
+import Piccolo
+import Piccolo_batch
+import present
+
+
+def benchmark_lea(n_blocks: int = 1_000_000, n_scalar: int = 2000, keysize: int = 128):
+    """LEA on n_blocks with LEA_batch, against LEA.encryption/decryption on n_scalar of them."""
+    rng = np.random.default_rng(0)
+    key = LEA.key128 if keysize == 128 else LEA.key192 if keysize == 192 else LEA.key256
+    round_keys = LEA_batch.round_keys_array(key, keysize)
+    blocks = rng.integers(0, 2**32, (n_blocks, 4), dtype=np.uint32)
+    print(f"LEA-{keysize}, {n_blocks} blocks{'encrypt':>14}{'decrypt':>12}")
+    rows = {}
+    for name, scalar_function, batch_function in (
+            ("encrypt", LEA.encryption, LEA_batch.encrypt_blocks),
+            ("decrypt", LEA.decryption, LEA_batch.decrypt_blocks)):
+        inputs = [LEA.deconversion(block) for block in blocks[:n_scalar].tolist()]
+        start = perf_counter()
+        expected = [scalar_function(block, key, keysize) for block in inputs]
+        scalar = n_scalar / (perf_counter() - start)
+
+        start = perf_counter()
+        outputs = batch_function(blocks, round_keys)
+        batch = n_blocks / (perf_counter() - start)
+        assert [LEA.deconversion(block) for block in outputs[:n_scalar].tolist()] == expected
+        rows[name] = (scalar, batch)
+    print(f"{'LEA.py':<24}{rows['encrypt'][0]:>12.0f}{rows['decrypt'][0]:>12.0f}")
+    print(f"{'LEA_batch':<24}{rows['encrypt'][1]:>12.0f}{rows['decrypt'][1]:>12.0f}")
+    print(f"{'speedup':<24}{rows['encrypt'][1] / rows['encrypt'][0]:>11.0f}x"
+          f"{rows['decrypt'][1] / rows['decrypt'][0]:>11.0f}x")
+
+
+def benchmark_lea_key_cache(n_blocks: int = 2000):
+    """Scalar LEA-128 with the key expanded on every block, from the cache, and on a buffer."""
+    rng = np.random.default_rng(0)
+    data = rng.bytes(16 * n_blocks)
+    plaintexts = [int.from_bytes(data[i:i + 16], 'big') for i in range(0, len(data), 16)]
+
+    def uncached(plaintext):
+        LEA.keyCache.clear()
+        return LEA.encryption(plaintext, LEA.key128, 128)
+
+    cipher = LEA.LEA(LEA.key128, 128)
+    rows = [("key expanded per block", lambda: [uncached(p) for p in plaintexts]),
+            ("cached key", lambda: [LEA.encryption(p, LEA.key128, 128) for p in plaintexts]),
+            ("LEA.encryptBuffer", lambda: cipher.encryptBuffer(data))]
+    print(f"LEA-128 scalar encryption, {n_blocks} blocks")
+    for name, run in rows:
+        start = perf_counter()
+        run()
+        print(f"{name:<24}{n_blocks / (perf_counter() - start):>12.0f}")
+
+
+class ComputedF:
+    """Stands for Piccolo.F_TABLE, computing Piccolo.f on every lookup."""
+
+    def __getitem__(self, b: int) -> int:
+        return Piccolo.f(b)
+
+
+def benchmark_piccolo(n_blocks: int = 2000, n_batch: int = 1_000_000):
+    """Piccolo-128 encryption with the F-function computed on every call, from its table,
+    and on n_batch blocks with Piccolo_batch."""
+    rng = np.random.default_rng(0)
+    blocks = [int(block) for block in rng.integers(0, 2**63, n_blocks, dtype=np.uint64)]
+    rk, wk = Piccolo.keyschedule128bit(0x00112233445566778899aabbccddeeff)
+    table = Piccolo.F_TABLE
+    print(f"Piccolo-128 encryption, {n_blocks} blocks")
+    for name, f_table in (("F computed per call", ComputedF()), ("F_TABLE", table)):
+        Piccolo.F_TABLE = f_table
+        try:
+            start = perf_counter()
+            for block in blocks:
+                Piccolo.G(block, wk, rk)
+            print(f"{name:<24}{n_blocks / (perf_counter() - start):>12.0f}")
+        finally:
+            Piccolo.F_TABLE = table
+    batch = rng.integers(0, 2**63, n_batch, dtype=np.uint64)
+    start = perf_counter()
+    Piccolo_batch.encrypt_blocks(batch, 0x00112233445566778899aabbccddeeff, 128)
+    print(f"{'Piccolo_batch':<24}{n_batch / (perf_counter() - start):>12.0f}")
+
+
+def benchmark_piccolo_decrypt(n_blocks: int = 2000):
+    """Piccolo-128 decryption with the keys reordered on every call and with a Piccolo object."""
+    rng = np.random.default_rng(0)
+    blocks = [int(block) for block in rng.integers(0, 2**63, n_blocks, dtype=np.uint64)]
+    key = 0x00112233445566778899aabbccddeeff
+    rk, wk = Piccolo.keyschedule128bit(key)
+    cipher = Piccolo.Piccolo(key)
+    print(f"Piccolo-128 decryption, {n_blocks} blocks")
+    for name, decrypt in (("Piccolo.decrypt", lambda block: Piccolo.decrypt(block, wk, rk)),
+                          ("Piccolo.decrypt_block", cipher.decrypt_block)):
+        start = perf_counter()
+        for block in blocks:
+            decrypt(block)
+        print(f"{name:<24}{n_blocks / (perf_counter() - start):>12.0f}")
+
+
+def benchmark_present(n_blocks: int = 500):
+    """PRESENT-80 with bit lists, through the integer adapters, and on integers."""
+    rng = np.random.default_rng(0)
+    blocks = [int(block) for block in rng.integers(0, 2**63, n_blocks, dtype=np.uint64)]
+    key = (1 << 80) - 1
+    bit_blocks = [present.convert_to_bitfield(block) for block in blocks]
+    bit_key = present.convert_to_bitfield(key, 80)
+    rows = [("encrypt_bits", lambda: [present.encrypt_bits(list(b), bit_key) for b in bit_blocks],
+             lambda: [present.decrypt_bits(list(b), bit_key) for b in bit_blocks]),
+            ("encrypt / decrypt", lambda: [present.encrypt(b, bit_key) for b in bit_blocks],
+             lambda: [present.decrypt(b, bit_key) for b in bit_blocks]),
+            ("encrypt_int", lambda: [present.encrypt_int(b, key) for b in blocks],
+             lambda: [present.decrypt_int(b, key) for b in blocks])]
+    print(f"PRESENT-80, {n_blocks} blocks{'encrypt':>13}{'decrypt':>12}")
+    for name, encrypt, decrypt in rows:
+        start = perf_counter()
+        encrypt()
+        encryption = n_blocks / (perf_counter() - start)
+        start = perf_counter()
+        decrypt()
+        print(f"{name:<24}{encryption:>12.0f}{n_blocks / (perf_counter() - start):>12.0f}")
+
+
+if __name__ == "__main__":
+    benchmark_present()
+    benchmark_piccolo()
+    benchmark_piccolo_decrypt()
+    benchmark_lea_key_cache()
+    for size in (128, 192, 256):
+        benchmark_lea(keysize=size)
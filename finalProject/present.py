@@ -69,14 +69,13 @@ def convert_to_bitfield(n: int, size: int = 64):
 def convert_to_int(bitfield: List[int]):
     """Converts a bitfield to an int."""
     value = 0
-    nb_bits = len(bitfield) - 1
-    for i in range(nb_bits, -1, -1):
-        value += bitfield[nb_bits-i] * 2**i
+    for bit in bitfield:
+        value = (value << 1) | bit
     return value
 
 
-def encrypt(plaintext: List[bool], key: List[bool]):
-    """Encrypts a bitfield plaintext through PRESENT."""
+def encrypt_bits(plaintext: List[bool], key: List[bool]):
+    """Encrypts a bitfield plaintext through PRESENT, one bit per list element."""
     state = plaintext
     key_registry = key
     for i in range(1, 32):
@@ -99,8 +98,8 @@ def compute_key_schedule(key: List[bool]) -> List[List[bool]]:
     return schedule
 
 
-def decrypt(ciphertext: List[int], key: int):
-    """Decrypt a bitfield ciphertext through PRESENT."""
+def decrypt_bits(ciphertext: List[int], key: List[int]):
+    """Decrypt a bitfield ciphertext through PRESENT, one bit per list element."""
     schedule = compute_key_schedule(key)
     state = ciphertext
     add_round_key(state, schedule[-1])
@@ -111,6 +110,89 @@ def decrypt(ciphertext: List[int], key: int):
     return state
 
 
+def _sp_table(position: int, box: List[int], permutation: List[int]) -> List[int]:
+    """Applies box to the nibbles of every byte value at byte position (0 is the least
+    significant byte) of a 64-bit state, then moves the bits through permutation."""
+    table = []
+    for byte in range(256):
+        value = ((box[byte >> 4] << 4) | box[byte & 0xF]) << (8 * position)
+        permuted = 0
+        for bit in range(64):
+            if value >> (63 - bit) & 1:
+                permuted |= 1 << (63 - permutation[bit])
+        table.append(permuted)
+    return table
+
+
+IDENTITY_BOX = list(range(16))
+# The SBOXLayer then pLayer of a state is the XOR of SP_TABLES[i][byte i].
+SP_TABLES = [_sp_table(i, SBOX, PERMUTATION_BOX) for i in range(8)]
+# The inverse pLayer alone, and the inverse SBOXLayer followed by the inverse pLayer.
+INV_P_TABLES = [_sp_table(i, IDENTITY_BOX, INV_PERMUTATION_BOX) for i in range(8)]
+INV_SP_TABLES = [_sp_table(i, INVSBOX, INV_PERMUTATION_BOX) for i in range(8)]
+# The inverse SBOXLayer on one byte.
+INVSBOX_BYTE = [(INVSBOX[byte >> 4] << 4) | INVSBOX[byte & 0xF] for byte in range(256)]
+MASK_80 = (1 << 80) - 1
+
+
+def round_keys(key: int) -> List[int]:
+    """The 32 round keys of an 80-bit key, as 64-bit integers."""
+    keys = []
+    for round in range(1, 33):
+        keys.append(key >> 16)
+        key = ((key << 61) | (key >> 19)) & MASK_80
+        key = (SBOX[key >> 76] << 76) | (key & ((1 << 76) - 1))
+        key ^= round << 15
+    return keys
+
+
+def sp_layer(state: int, tables: List[List[int]]) -> int:
+    """Combined SBOXLayer and pLayer through 8 byte lookups."""
+    t_0, t_1, t_2, t_3, t_4, t_5, t_6, t_7 = tables
+    return (t_0[state & 0xFF] ^ t_1[(state >> 8) & 0xFF] ^ t_2[(state >> 16) & 0xFF]
+            ^ t_3[(state >> 24) & 0xFF] ^ t_4[(state >> 32) & 0xFF] ^ t_5[(state >> 40) & 0xFF]
+            ^ t_6[(state >> 48) & 0xFF] ^ t_7[state >> 56])
+
+
+def decryption_round_keys(keys: List[int]) -> List[int]:
+    """Round keys for decrypt_int, the middle ones go through the inverse pLayer."""
+    return ([keys[-1]] + [sp_layer(key, INV_P_TABLES) for key in reversed(keys[1:-1])]
+            + [keys[0]])
+
+
+def encrypt_int(plaintext: int, key: int) -> int:
+    """Encrypts a 64-bit plaintext with an 80-bit key."""
+    keys = round_keys(key)
+    state = plaintext
+    for round_key in keys[:-1]:
+        state = sp_layer(state ^ round_key, SP_TABLES)
+    return state ^ keys[-1]
+
+
+def decrypt_int(ciphertext: int, key: int) -> int:
+    """Decrypts a 64-bit ciphertext with an 80-bit key.
+
+    InvP(InvS(x) ^ k) = InvP(InvS(x)) ^ InvP(k), so each round is one lookup in
+    INV_SP_TABLES and a XOR with a round key through the inverse pLayer.
+    """
+    keys = decryption_round_keys(round_keys(key))
+    state = sp_layer(ciphertext ^ keys[0], INV_P_TABLES)
+    for round_key in keys[1:-1]:
+        state = sp_layer(state, INV_SP_TABLES) ^ round_key
+    state = int.from_bytes(bytes(INVSBOX_BYTE[byte] for byte in state.to_bytes(8, 'big')), 'big')
+    return state ^ keys[-1]
+
+
+def encrypt(plaintext: List[bool], key: List[bool]):
+    """Encrypts a bitfield plaintext through PRESENT."""
+    return convert_to_bitfield(encrypt_int(convert_to_int(plaintext), convert_to_int(key)))
+
+
+def decrypt(ciphertext: List[int], key: List[int]):
+    """Decrypt a bitfield ciphertext through PRESENT."""
+    return convert_to_bitfield(decrypt_int(convert_to_int(ciphertext), convert_to_int(key)))
+
+
 if __name__ == "__main__":
     plaintext = convert_to_bitfield(0)
     key = convert_to_bitfield(0, 80)
@@ -118,3 +200,11 @@ if __name__ == "__main__":
     decipheredText = decrypt(ciphertext, key)
 
     assert convert_to_int(decipheredText) == 0
+    # Test vectors of the PRESENT paper.
+    vectors = [(0, 0, 0x5579C1387B228445), (0, MASK_80, 0xE72C46C0F5945049),
+               (2**64 - 1, 0, 0xA112FFC72F68417B), (2**64 - 1, MASK_80, 0x3333DCD3213210D2)]
+    for plaintext, key, ciphertext in vectors:
+        assert encrypt_int(plaintext, key) == ciphertext
+        assert decrypt_int(ciphertext, key) == plaintext
+        assert encrypt(convert_to_bitfield(plaintext), convert_to_bitfield(key, 80)) == \
+            encrypt_bits(convert_to_bitfield(plaintext), convert_to_bitfield(key, 80))
@@ -1,6 +1,10 @@
 """An implementation of AES-128 in Python."""
-from typing import List
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import numpy as np
 from sbox import SBOX, INVSBOX
+from gf import MUL, MUL2, MUL3, MUL9, MUL11, MUL13, MUL14
+from key_schedule import expand_key
 ROUNDS = 4
 
 
@@ -30,30 +34,81 @@ def main():
            0xAB, 0xF7, 0x15, 0x88, 0x09, 0xCF, 0x4F, 0x3C]
     ciphertext = [0x39, 0x25, 0x84, 0x1D, 0x02, 0xDC, 0x09, 0xFB,
                   0xDC, 0x11, 0x85, 0x97, 0x19, 0x6A, 0x0B, 0x32]
-    assert encrypt(plaintext, key) == ciphertext
+    # The test vector is for the full 10 rounds AES-128.
+    assert encrypt(plaintext, key, rounds=10) == ciphertext
+    assert decrypt(ciphertext, key, rounds=10) == plaintext
+    assert decrypt(encrypt(plaintext, key), key) == plaintext
+    aes = AES(key, rounds=10)
+    assert aes.encrypt_block(plaintext) == ciphertext
+    assert aes.encrypt_batch([plaintext, plaintext]).tolist() == [ciphertext, ciphertext]
+    assert aes.decrypt_batch([ciphertext]).tolist() == [plaintext]
+    assert cipher(key, rounds=10) is cipher(list(key), rounds=10)
 
 
-def encrypt(plaintext, key):
-    """Encrypt a plaintext."""
-    round_keys = key_schedule_128(key)
-    state = add_round_key(plaintext, round_keys[0])
-    for rnd in range(ROUNDS - 1):
-        state = normal_round(state, round_keys[rnd + 1])
-    ciphertext = last_round(state, round_keys[ROUNDS])
-    return ciphertext
+class AES:
+    """AES-128 with the round keys expanded once, for ROUNDS rounds by default.
 
+    The batch methods work on (N, 16) NumPy arrays through aes_batch.
+    """
 
-def decrypt(ciphertext: List[int], key: List[int]) -> List[int]:
-    """Decrypt a ciphertext."""
-    round_keys = key_schedule_128(key)
-    state = add_round_key(ciphertext, round_keys[-1])
-    state = sub_bytes(shift_rows(state, inv=True), inv=True)
-    for rnd in range(ROUNDS-2, 0, -1):
-        state = add_round_key(state, round_keys[rnd])
-        state = sub_bytes(shift_rows(mix_columns(
-            state, inv=True), inv=True), inv=True)
-    state = add_round_key(state, round_keys[0])
-    return state
+    def __init__(self, key: List[int], rounds: Optional[int] = None):
+        self.rounds = ROUNDS if rounds is None else rounds
+        self.round_keys = expand_key(key, self.rounds)
+        self._round_keys_array = None
+
+    def encrypt_block(self, plaintext: List[int]) -> List[int]:
+        """Encrypt one 16 byte block."""
+        round_keys = self.round_keys
+        state = add_round_key(plaintext, round_keys[0])
+        for rnd in range(1, self.rounds):
+            state = normal_round(state, round_keys[rnd])
+        return last_round(state, round_keys[self.rounds])
+
+    def decrypt_block(self, ciphertext: List[int]) -> List[int]:
+        """Decrypt one 16 byte block."""
+        round_keys = self.round_keys
+        state = add_round_key(ciphertext, round_keys[self.rounds])
+        state = sub_bytes(shift_rows(state, inv=True), inv=True)
+        for rnd in range(self.rounds - 1, 0, -1):
+            state = add_round_key(state, round_keys[rnd])
+            state = sub_bytes(shift_rows(mix_columns(
+                state, inv=True), inv=True), inv=True)
+        return add_round_key(state, round_keys[0])
+
+    def _batch_round_keys(self):
+        if self._round_keys_array is None:
+            self._round_keys_array = np.array(self.round_keys, dtype=np.uint8)
+        return self._round_keys_array
+
+    def encrypt_batch(self, plaintexts):
+        """Encrypt (N, 16) blocks, returns a NumPy array."""
+        from aes_batch import encrypt_states
+        return encrypt_states(plaintexts, self._batch_round_keys())
+
+    def decrypt_batch(self, ciphertexts):
+        """Decrypt (N, 16) blocks, returns a NumPy array."""
+        from aes_batch import decrypt_states
+        return decrypt_states(ciphertexts, self._batch_round_keys())
+
+
+@lru_cache(maxsize=64)
+def _cipher(key: Tuple[int, ...], rounds: int) -> AES:
+    return AES(list(key), rounds)
+
+
+def cipher(key: List[int], rounds: Optional[int] = None) -> AES:
+    """The AES object of key, shared by all the calls with the same key and rounds."""
+    return _cipher(tuple(key), ROUNDS if rounds is None else rounds)
+
+
+def encrypt(plaintext, key, rounds: Optional[int] = None):
+    """Encrypt a plaintext, through ROUNDS rounds by default."""
+    return cipher(key, rounds).encrypt_block(plaintext)
+
+
+def decrypt(ciphertext: List[int], key: List[int], rounds: Optional[int] = None) -> List[int]:
+    """Decrypt a ciphertext, through ROUNDS rounds by default."""
+    return cipher(key, rounds).decrypt_block(ciphertext)
 
 
 def normal_round(state, round_key):
@@ -140,59 +195,47 @@ def mix_columns(state: List[int], inv=False):
 
 def multiply_by_two(byte):
     """Multiply byte by two, reducing the result with the Rijndael polynomial."""
-    result = (byte << 1) & 0xFF
-    if (byte >> 7) & 1 == 1:
-        result ^= 0x1B
-    return result
+    return MUL2[byte]
 
 
 def multiply_by_nine(byte: int) -> int:
     """Shortcut for multiply by nine."""
-    return multiply_by_eight(byte) ^ byte
+    return MUL9[byte]
 
 
 def multiply_by_eleven(byte: int) -> int:
     """Shortcut for multiply by 11."""
-    return multiply_by_two(multiply_by_four(byte) ^ byte) ^ byte
+    return MUL11[byte]
 
 
 def multiply_by_thirteen(byte: int) -> int:
     """Shortcut for 13."""
-    return multiply_by_four(multiply_by_two(byte) ^ byte) ^ byte
+    return MUL13[byte]
 
 
 def multiply_by_fourteen(byte: int) -> int:
     """Shortcut for 14."""
-    return multiply_by_two(multiply_by_two(multiply_by_two(byte) ^ byte) ^ byte)
+    return MUL14[byte]
 
 
 def multiply_by_four(byte: int) -> int:
     """Shortcut for multiply by four."""
-    return multiply_by_two(multiply_by_two(byte))
+    return MUL[4][byte]
 
 
 def multiply_by_eight(byte: int) -> int:
     """Shortcut for multiply by eight."""
-    return multiply_by_two(multiply_by_four(byte))
+    return MUL[8][byte]
 
 
 def mix_one_column(col: List[int]) -> List[int]:
     """Multiply a column with the MixColumns matrix."""
     b_0, b_1, b_2, b_3 = col
     return [
-        multiply_by_two(b_0) ^       # 02 * b_0
-        multiply_by_two(b_1) ^ b_1 ^  # 03 * b_1
-        b_2 ^ b_3,                   # 01 * b_2 + 01 * b_3
-        b_0 ^                        # 01 * b_0
-        multiply_by_two(b_1) ^       # 02 * b_1
-        multiply_by_two(b_2) ^ b_2 ^  # 03 * b_2
-        b_3,                         # 01 * b_3
-        b_0 ^ b_1 ^                  # 01 * b_0 + 01 * b_1
-        multiply_by_two(b_2) ^       # 02 * b_2
-        multiply_by_two(b_3) ^ b_3,  # 03 * b_3
-        multiply_by_two(b_0) ^ b_0 ^  # 03 * b_0
-        b_1 ^ b_2 ^                  # 01 * b_1 + 01 * b_2
-        multiply_by_two(b_3),        # 02 * b_3
+        MUL2[b_0] ^ MUL3[b_1] ^ b_2 ^ b_3,
+        b_0 ^ MUL2[b_1] ^ MUL3[b_2] ^ b_3,
+        b_0 ^ b_1 ^ MUL2[b_2] ^ MUL3[b_3],
+        MUL3[b_0] ^ b_1 ^ b_2 ^ MUL2[b_3],
     ]
 
 
@@ -200,51 +243,18 @@ def inv_mix_one_column(col: List[int]) -> List[int]:
     """Multiply a column with the inverse MixColumns matrix."""
     b_0, b_1, b_2, b_3 = col
     return [
-        multiply_by_fourteen(b_0) ^
-        multiply_by_eleven(b_1) ^
-        multiply_by_thirteen(b_2) ^
-        multiply_by_nine(b_3),
-        multiply_by_nine(b_0) ^
-        multiply_by_fourteen(b_1) ^
-        multiply_by_eleven(b_2) ^
-        multiply_by_thirteen(b_3),
-        multiply_by_thirteen(b_0) ^
-        multiply_by_nine(b_1) ^
-        multiply_by_fourteen(b_2) ^
-        multiply_by_eleven(b_3),
-        multiply_by_eleven(b_0) ^
-        multiply_by_thirteen(b_1) ^
-        multiply_by_nine(b_2) ^
-        multiply_by_fourteen(b_3),
+        MUL14[b_0] ^ MUL11[b_1] ^ MUL13[b_2] ^ MUL9[b_3],
+        MUL9[b_0] ^ MUL14[b_1] ^ MUL11[b_2] ^ MUL13[b_3],
+        MUL13[b_0] ^ MUL9[b_1] ^ MUL14[b_2] ^ MUL11[b_3],
+        MUL11[b_0] ^ MUL13[b_1] ^ MUL9[b_2] ^ MUL14[b_3],
     ]
 
 
-def key_schedule_128(key: List[int]) -> List[List[int]]:
-    """Create the list of round keys from the key."""
-    round_keys = [[key[i] for i in range(16)]]
-    round_constant = 1
-    for i in range(ROUNDS):
-        b_0, b_1, b_2, b_3 = (
-            SBOX[round_keys[i][13]],
-            SBOX[round_keys[i][14]],
-            SBOX[round_keys[i][15]],
-            SBOX[round_keys[i][12]],
-        )
-        b_0 ^= round_constant
-        round_constant = multiply_by_two(round_constant)
-        new_round_key = [
-            round_keys[i][0] ^ b_0,
-            round_keys[i][1] ^ b_1,
-            round_keys[i][2] ^ b_2,
-            round_keys[i][3] ^ b_3,
-        ]
-        for j in range(3):
-            for k in range(4):
-                new_round_key.append(
-                    new_round_key[k + 4 * j] ^ round_keys[i][k + 4 * (j + 1)]
-                )
-        round_keys.append(new_round_key)
-    return round_keys
+def key_schedule_128(key: List[int], rounds: Optional[int] = None) -> List[List[int]]:
+    """Create the list of round keys from the key, for ROUNDS rounds by default."""
+    if rounds is None:
+        rounds = ROUNDS
+    return [list(round_key) for round_key in expand_key(key, rounds)]
 
 
 if __name__ == "__main__":
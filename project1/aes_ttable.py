@@ -0,0 +1,169 @@
+"""AES-128 on 32-bit words with T-tables.
+
+Each column of the state is a word whose most significant byte is row 0.
+A round is four lookups per column in Te0..Te3, which combine SubBytes,
+ShiftRows and MixColumns, and decryption uses the equivalent inverse cipher
+with Td0..Td3.
+"""
+import struct
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aes
+from sbox import SBOX, INVSBOX
+
+
+def _word(b_0: int, b_1: int, b_2: int, b_3: int) -> int:
+    return (b_0 << 24) | (b_1 << 16) | (b_2 << 8) | b_3
+
+
+def _rotate_right(word: int, bits: int) -> int:
+    return ((word >> bits) | (word << (32 - bits))) & 0xFFFFFFFF
+
+
+def _tables(first: List[int]) -> Tuple[List[int], ...]:
+    """The four tables, each the previous one rotated right by a byte."""
+    return (first,
+            [_rotate_right(word, 8) for word in first],
+            [_rotate_right(word, 16) for word in first],
+            [_rotate_right(word, 24) for word in first])
+
+
+TE0, TE1, TE2, TE3 = _tables([
+    _word(aes.multiply_by_two(s), s, s, aes.multiply_by_two(s) ^ s)
+    for s in SBOX
+])
+TD0, TD1, TD2, TD3 = _tables([
+    _word(aes.multiply_by_fourteen(s), aes.multiply_by_nine(s),
+          aes.multiply_by_thirteen(s), aes.multiply_by_eleven(s))
+    for s in INVSBOX
+])
+
+
+def to_words(block: List[int]) -> List[int]:
+    """Pack 16 bytes into 4 column words."""
+    return list(struct.unpack('>4I', bytes(block)))
+
+
+def from_words(words: List[int]) -> List[int]:
+    """Unpack 4 column words into 16 bytes."""
+    return list(struct.pack('>4I', *words))
+
+
+def inv_mix_column_word(word: int) -> int:
+    """InvMixColumns on one column word, the Td tables undo their INVSBOX through SBOX."""
+    return (TD0[SBOX[word >> 24]] ^ TD1[SBOX[(word >> 16) & 0xFF]]
+            ^ TD2[SBOX[(word >> 8) & 0xFF]] ^ TD3[SBOX[word & 0xFF]])
+
+
+WordKeys = Tuple[Tuple[int, ...], ...]
+
+
+@lru_cache(maxsize=64)
+def _encryption_round_keys(key: Tuple[int, ...], rounds: int) -> WordKeys:
+    return tuple(tuple(to_words(round_key)) for round_key in aes.key_schedule_128(key, rounds))
+
+
+@lru_cache(maxsize=64)
+def _decryption_round_keys(key: Tuple[int, ...], rounds: int) -> WordKeys:
+    round_keys = _encryption_round_keys(key, rounds)
+    return ((round_keys[-1],)
+            + tuple(tuple(inv_mix_column_word(word) for word in round_key)
+                    for round_key in reversed(round_keys[1:-1]))
+            + (round_keys[0],))
+
+
+def encryption_round_keys(key: List[int], rounds: Optional[int] = None) -> List[List[int]]:
+    """Round keys as lists of 4 words."""
+    rounds = aes.ROUNDS if rounds is None else rounds
+    return [list(round_key) for round_key in _encryption_round_keys(tuple(key), rounds)]
+
+
+def decryption_round_keys(key: List[int], rounds: Optional[int] = None) -> List[List[int]]:
+    """Round keys of the equivalent inverse cipher, in the order they are used."""
+    rounds = aes.ROUNDS if rounds is None else rounds
+    return [list(round_key) for round_key in _decryption_round_keys(tuple(key), rounds)]
+
+
+def encrypt_words(state: List[int], round_keys: List[List[int]]) -> List[int]:
+    """Encrypt a state of 4 column words."""
+    s_0, s_1, s_2, s_3 = (word ^ key for word, key in zip(state, round_keys[0]))
+    for k_0, k_1, k_2, k_3 in round_keys[1:-1]:
+        s_0, s_1, s_2, s_3 = (
+            TE0[s_0 >> 24] ^ TE1[(s_1 >> 16) & 0xFF] ^ TE2[(s_2 >> 8) & 0xFF] ^ TE3[s_3 & 0xFF] ^ k_0,
+            TE0[s_1 >> 24] ^ TE1[(s_2 >> 16) & 0xFF] ^ TE2[(s_3 >> 8) & 0xFF] ^ TE3[s_0 & 0xFF] ^ k_1,
+            TE0[s_2 >> 24] ^ TE1[(s_3 >> 16) & 0xFF] ^ TE2[(s_0 >> 8) & 0xFF] ^ TE3[s_1 & 0xFF] ^ k_2,
+            TE0[s_3 >> 24] ^ TE1[(s_0 >> 16) & 0xFF] ^ TE2[(s_1 >> 8) & 0xFF] ^ TE3[s_2 & 0xFF] ^ k_3,
+        )
+    state = (s_0, s_1, s_2, s_3)
+    return [
+        _word(SBOX[state[c] >> 24], SBOX[(state[(c + 1) % 4] >> 16) & 0xFF],
+              SBOX[(state[(c + 2) % 4] >> 8) & 0xFF], SBOX[state[(c + 3) % 4] & 0xFF]) ^ key
+        for c, key in enumerate(round_keys[-1])
+    ]
+
+
+def decrypt_words(state: List[int], round_keys: List[List[int]]) -> List[int]:
+    """Decrypt a state of 4 column words with decryption_round_keys."""
+    s_0, s_1, s_2, s_3 = (word ^ key for word, key in zip(state, round_keys[0]))
+    for k_0, k_1, k_2, k_3 in round_keys[1:-1]:
+        s_0, s_1, s_2, s_3 = (
+            TD0[s_0 >> 24] ^ TD1[(s_3 >> 16) & 0xFF] ^ TD2[(s_2 >> 8) & 0xFF] ^ TD3[s_1 & 0xFF] ^ k_0,
+            TD0[s_1 >> 24] ^ TD1[(s_0 >> 16) & 0xFF] ^ TD2[(s_3 >> 8) & 0xFF] ^ TD3[s_2 & 0xFF] ^ k_1,
+            TD0[s_2 >> 24] ^ TD1[(s_1 >> 16) & 0xFF] ^ TD2[(s_0 >> 8) & 0xFF] ^ TD3[s_3 & 0xFF] ^ k_2,
+            TD0[s_3 >> 24] ^ TD1[(s_2 >> 16) & 0xFF] ^ TD2[(s_1 >> 8) & 0xFF] ^ TD3[s_0 & 0xFF] ^ k_3,
+        )
+    state = (s_0, s_1, s_2, s_3)
+    return [
+        _word(INVSBOX[state[c] >> 24], INVSBOX[(state[(c + 3) % 4] >> 16) & 0xFF],
+              INVSBOX[(state[(c + 2) % 4] >> 8) & 0xFF], INVSBOX[state[(c + 1) % 4] & 0xFF]) ^ key
+        for c, key in enumerate(round_keys[-1])
+    ]
+
+
+def encrypt(plaintext: List[int], key: List[int], rounds: Optional[int] = None) -> List[int]:
+    """Encrypt a plaintext, same interface as aes.encrypt, the word keys are cached per key."""
+    rounds = aes.ROUNDS if rounds is None else rounds
+    return from_words(encrypt_words(to_words(plaintext), _encryption_round_keys(tuple(key), rounds)))
+
+
+def decrypt(ciphertext: List[int], key: List[int], rounds: Optional[int] = None) -> List[int]:
+    """Decrypt a ciphertext, same interface as aes.decrypt, the word keys are cached per key."""
+    rounds = aes.ROUNDS if rounds is None else rounds
+    return from_words(decrypt_words(to_words(ciphertext), _decryption_round_keys(tuple(key), rounds)))
+
+
+Backend = Tuple[Callable[..., List[int]], Callable[..., List[int]]]
+# (encrypt, decrypt) pairs sharing the interface of aes.encrypt and aes.decrypt.
+BACKENDS: Dict[str, Backend] = {
+    "reference": (aes.encrypt, aes.decrypt),
+    "ttable": (encrypt, decrypt),
+}
+
+
+def get_backend(name: str) -> Backend:
+    """Returns the (encrypt, decrypt) functions of a backend."""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown AES backend {name}, "
+                         f"expected one of {', '.join(BACKENDS)}.") from None
+
+
+def main():
+    """Cross-check the T-tables with the FIPS-197 vector and the reference functions."""
+    plaintext = [0x32, 0x43, 0xF6, 0xA8, 0x88, 0x5A, 0x30, 0x8D,
+                 0x31, 0x31, 0x98, 0xA2, 0xE0, 0x37, 0x07, 0x34]
+    key = [0x2B, 0x7E, 0x15, 0x16, 0x28, 0xAE, 0xD2, 0xA6,
+           0xAB, 0xF7, 0x15, 0x88, 0x09, 0xCF, 0x4F, 0x3C]
+    ciphertext = [0x39, 0x25, 0x84, 0x1D, 0x02, 0xDC, 0x09, 0xFB,
+                  0xDC, 0x11, 0x85, 0x97, 0x19, 0x6A, 0x0B, 0x32]
+    assert encrypt(plaintext, key, rounds=10) == ciphertext
+    assert decrypt(ciphertext, key, rounds=10) == plaintext
+    for rounds in range(1, 11):
+        assert encrypt(plaintext, key, rounds) == aes.encrypt(plaintext, key, rounds)
+        assert decrypt(ciphertext, key, rounds) == aes.decrypt(ciphertext, key, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Encrypted delta sets, cached in memory and optionally on disk."""
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+from oracle import Oracle
+
+CacheKey = Tuple[Optional[str], int, Tuple[int, ...]]
+
+
+def gen_alpha_set(column: int, constant: Optional[List[int]] = None) -> List[List[int]]:
+    "Create an delta set at the right byte (= column), the other bytes set to constant (0 by default)"
+    alpha_set = []
+    for i in range(256):
+        temp = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0] if constant is None else list(constant)
+        temp[column] = i
+        alpha_set.append(temp)
+    return alpha_set
+
+
+class AlphaSetOracle:
+    """Returns the ciphertexts of delta sets, querying oracle for each of them only once.
+
+    Delta sets are kept in a memory LRU of max_size entries and, if cache_dir
+    is given, in .npy files that outlive the process. Entries are keyed by
+    (oracle.cache_id, column, constant bytes), the cache id standing for the
+    key and number of rounds. An oracle without a cache id cannot use cache_dir.
+    """
+
+    def __init__(self, oracle: Oracle, max_size: int = 64, cache_dir: Optional[str] = None):
+        if cache_dir is not None and oracle.cache_id is None:
+            raise ValueError(f"{type(oracle).__name__} has no cache_id identifying its key, "
+                             "its delta sets cannot be cached in cache_dir.")
+        self.oracle = oracle
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._cache: "OrderedDict[CacheKey, List[List[int]]]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.computed = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def queries(self) -> int:
+        return self.memory_hits + self.disk_hits + self.computed
+
+    def _cache_key(self, column: int, constant: Optional[List[int]]) -> CacheKey:
+        return (self.oracle.cache_id, column, tuple(constant or [0] * 16))
+
+    def _path(self, cache_key: CacheKey) -> str:
+        digest = hashlib.sha256(repr(cache_key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+    def _lookup(self, cache_key: CacheKey) -> Optional[List[List[int]]]:
+        """Return a cached delta set, from memory or disk, or None."""
+        if cache_key in self._cache:
+            self.memory_hits += 1
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
+        if self.cache_dir is not None:
+            ciphertexts = self._load(self._path(cache_key))
+            if ciphertexts is not None:
+                self.disk_hits += 1
+                self._store(cache_key, ciphertexts, write=False)
+                return ciphertexts
+        return None
+
+    @staticmethod
+    def _load(path: str) -> Optional[List[List[int]]]:
+        """The delta set stored at path, None if it is missing or unreadable."""
+        try:
+            ciphertexts = np.load(path)
+        except (OSError, ValueError, EOFError):
+            return None
+        return ciphertexts.tolist() if ciphertexts.shape == (256, 16) else None
+
+    def _save(self, path: str, ciphertexts: List[List[int]]):
+        """Write to a temporary file then rename it, readers never see a partial file."""
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as file:
+            np.save(file, np.array(ciphertexts, dtype=np.uint8))
+        os.replace(file.name, path)
+
+    def _store(self, cache_key: CacheKey, ciphertexts: List[List[int]], write: bool = True):
+        if write and self.cache_dir is not None:
+            self._save(self._path(cache_key), ciphertexts)
+        self._cache[cache_key] = ciphertexts
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def prefetch(self, alpha_sets: Sequence[Tuple[int, Optional[List[int]]]]):
+        """Query all the (column, constant) delta sets not cached yet in a single batch."""
+        missing = {}
+        for column, constant in alpha_sets:
+            cache_key = self._cache_key(column, constant)
+            on_disk = self.cache_dir is not None and os.path.exists(self._path(cache_key))
+            if cache_key not in self._cache and not on_disk:
+                missing[cache_key] = gen_alpha_set(column, constant)
+        if not missing:
+            return
+        ciphertexts = self.oracle.encrypt([plaintext for alpha_set in missing.values()
+                                           for plaintext in alpha_set])
+        for i, cache_key in enumerate(missing):
+            self.computed += 1
+            self._store(cache_key, ciphertexts[256 * i:256 * (i + 1)])
+
+    def ciphertexts(self, column: int, constant: Optional[List[int]] = None) -> List[List[int]]:
+        """Return the encrypted delta set active on column."""
+        cache_key = self._cache_key(column, constant)
+        ciphertexts = self._lookup(cache_key)
+        if ciphertexts is None:
+            self.computed += 1
+            ciphertexts = self.oracle.encrypt(gen_alpha_set(column, constant))
+            self._store(cache_key, ciphertexts)
+        return ciphertexts
+
+    def stats(self) -> str:
+        """Summary of the counters."""
+        return (f"{self.queries} delta set queries: {self.memory_hits} from memory, "
+                f"{self.disk_hits} from disk, {self.computed} from the oracle")
+
+
+if __name__ == "__main__":
+    import tempfile
+    import aes
+    from oracle import LocalOracle, SocketOracle, start_device
+    from utils import KEY
+    with tempfile.TemporaryDirectory() as directory:
+        oracle = AlphaSetOracle(LocalOracle(KEY), cache_dir=directory, max_size=2)
+        first = oracle.ciphertexts(0)
+        assert oracle.ciphertexts(0) == first
+        assert first == [aes.encrypt(plaintext, KEY) for plaintext in gen_alpha_set(0)]
+        oracle.ciphertexts(1)
+        oracle.ciphertexts(2)
+        assert oracle.ciphertexts(0) == first  # evicted from memory, read from disk
+        assert (oracle.memory_hits, oracle.disk_hits, oracle.computed) == (1, 1, 3)
+        other = AlphaSetOracle(LocalOracle(KEY), cache_dir=directory)
+        assert other.ciphertexts(2, [0] * 16) == oracle.ciphertexts(2)
+        other.prefetch([(column, None) for column in range(6)])
+        assert other.oracle.batch_sizes == [3 * 256]
+        assert other.ciphertexts(5) == oracle.ciphertexts(5)
+        # A truncated entry is a miss, queried again and rewritten.
+        path = other._path(other._cache_key(7, None))
+        with open(path, "wb") as file:
+            file.write(b"\x93NUMPY")
+        fresh = AlphaSetOracle(LocalOracle(KEY), cache_dir=directory)
+        assert fresh.ciphertexts(7) == [aes.encrypt(plaintext, KEY) for plaintext in gen_alpha_set(7)]
+        assert (fresh.disk_hits, fresh.computed) == (0, 1)
+        assert AlphaSetOracle(LocalOracle(KEY), cache_dir=directory).ciphertexts(7) == fresh.ciphertexts(7)
+        assert not [name for name in os.listdir(directory) if name.endswith(".tmp")]
+        # A device is only cached on disk under an id naming its key.
+        server = start_device(KEY)
+        with SocketOracle(server.server_address) as device:
+            try:
+                AlphaSetOracle(device, cache_dir=directory)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("a device without cache_id must not use the disk cache")
+            assert AlphaSetOracle(device).ciphertexts(7) == fresh.ciphertexts(7)
+        with SocketOracle(server.server_address, f"device:{bytes(KEY).hex()}") as device:
+            assert AlphaSetOracle(device, cache_dir=directory).ciphertexts(7) == fresh.ciphertexts(7)
+        server.shutdown()
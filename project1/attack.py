@@ -1,24 +1,23 @@
-from random import choice
-from typing import List
+from random import Random
+from typing import List, Optional, Tuple
+import numpy as np
 from utils import KEY
 
-from aes import encrypt, add_round_key, shift_rows, sub_bytes, SBOX
+from aes import add_round_key, shift_rows, sub_bytes
+from aes_batch import INVSBOX_TABLE
+from alpha_oracle import AlphaSetOracle
+from key_schedule import previous_round_key
+from oracle import LocalOracle
 
 
-def create_encrypt_alpha_set(column: int) -> List[List[int]]:
-    "Return an encrypt delta set"
-    alpha_set = gen_alpha_set(column)
-    return [encrypt(value, KEY) for value in alpha_set]
+# Delta sets used when the attack is not given an oracle.
+DEFAULT_ORACLE = AlphaSetOracle(LocalOracle(KEY))
 
 
-def gen_alpha_set(column: int) -> List[List[int]]:
-    "Create an delta set at the right byte (= column)"
-    alpha_set = []
-    for i in range(256):
-        temp = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-        temp[column] = i
-        alpha_set.append(temp)
-    return alpha_set
+def create_encrypt_alpha_set(column: int, constant: Optional[List[int]] = None,
+                             oracle: Optional[AlphaSetOracle] = None) -> List[List[int]]:
+    "Return an encrypt delta set"
+    return (oracle or DEFAULT_ORACLE).ciphertexts(column, constant)
 
 
 def reverse_last_round_on_byte(ciphertext: List[int], round_key: List[int]) -> List[int]:
@@ -41,72 +40,64 @@ def check_guess(last_round_alpha_set: List[List[int]], column: int) -> bool:
     return (total == 0)
 
 
-def guess_last_round_key() -> List[int]:
-    " Guess the last roundkey with all the delta set. "
-    key = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    # Step 01 : for each byte of the round key, we're going to try the delta set with the guessed key
-    for i in range(16):
-        temp_Round = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-        temp_key = []
-        cipher_alpha_set = create_encrypt_alpha_set(i)
-        for byte in range(256):
-            b = []
-            temp_Round[i] = byte
-            for ciphertext in cipher_alpha_set:
-                b.append(shift_rows(
-                    reverse_last_round_on_byte(ciphertext, temp_Round)))
-            # Step 02 : Check the guess key
-            if (check_guess(b, i)):
-                temp_key.append(byte)
-        # Step 03 : Check the number of good guesses, if multiple good choices
-        #  then supress the wrong one with other delta set
-        if (len(temp_key) > 1):
-            test = choice([k for k in range(16) if k not in [i]])
-            cipher_alpha_set_2 = create_encrypt_alpha_set(test)
-            for item in temp_key:
-                b = []
-                temp_Round[i] = item
-                for ciphertext in cipher_alpha_set_2:
-                    b.append(shift_rows(
-                        reverse_last_round_on_byte(ciphertext, temp_Round)))
-                if (check_guess(b, i)):
-                    key[i] = item
+def partial_decryption_table(ciphertexts: List[List[int]], position: int) -> np.ndarray:
+    """Reverse the last round on one byte for all the key guesses at once.
+
+    Returns the (256, n_ciphertexts) table INVSBOX[ciphertext[position] ^ guess].
+    """
+    ciphertexts = np.asarray(ciphertexts, dtype=np.uint8)
+    guesses = np.arange(256, dtype=np.uint8)
+    return INVSBOX_TABLE[guesses[:, None] ^ ciphertexts[None, :, position]]
+
+
+def balanced_guesses(cipher_alpha_set: List[List[int]], position: int) -> List[int]:
+    """Key guesses for which the byte before the last round XORs to 0 over the delta set."""
+    sums = np.bitwise_xor.reduce(partial_decryption_table(cipher_alpha_set, position), axis=1)
+    return np.flatnonzero(sums == 0).tolist()
+
+
+def guess_round_key_byte(position: int, rng: Random, oracle: Optional[AlphaSetOracle] = None,
+                         max_alpha_sets: int = 64) -> Tuple[int, List[int]]:
+    """Guess one byte of the last round key.
+
+    Returns the byte and the number of candidates left after each delta set.
+    """
+    # Step 01 : keep the guesses balancing the delta set active on this byte
+    candidates = balanced_guesses(create_encrypt_alpha_set(position, oracle=oracle), position)
+    counts = [len(candidates)]
+    # Step 02 : while there are false positives, filter them with other delta
+    #  sets. The ones active on the other bytes come first as they are shared
+    #  with the other positions, then random constant bytes are used.
+    columns = [k for k in range(16) if k != position]
+    rng.shuffle(columns)
+    while len(candidates) > 1 and len(counts) < max_alpha_sets:
+        if len(counts) <= len(columns):
+            column, constant = columns[len(counts) - 1], None
         else:
-            key[i] = temp_key[0]
-    return (key)
+            column = rng.choice(columns)
+            constant = [rng.randrange(256) for _ in range(16)]
+        balanced = balanced_guesses(create_encrypt_alpha_set(column, constant, oracle), position)
+        candidates = [guess for guess in candidates if guess in balanced]
+        counts.append(len(candidates))
+    if len(candidates) != 1:
+        raise RuntimeError(f"{len(candidates)} candidates left for byte {position} "
+                           f"after {len(counts)} delta sets.")
+    return candidates[0], counts
+
+
+def guess_last_round_key(rng: Optional[Random] = None,
+                         oracle: Optional[AlphaSetOracle] = None) -> List[int]:
+    " Guess the last roundkey with all the delta set. "
+    if rng is None:
+        rng = Random()
+    # One batch for the delta sets every position starts with.
+    (oracle or DEFAULT_ORACLE).prefetch([(i, None) for i in range(16)])
+    return [guess_round_key_byte(i, rng, oracle)[0] for i in range(16)]
 
 
 def get_previous_round_key(round_key: List[int], rnd: int):
     """Get the round key of the previous round."""
-    previous = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    round_constant = [2**rnd, 0, 0, 0]
-    # Forth Column
-    previous[12] = round_key[8] ^ round_key[12]
-    previous[13] = round_key[9] ^ round_key[13]
-    previous[14] = round_key[10] ^ round_key[14]
-    previous[15] = round_key[11] ^ round_key[15]
-    # Third Column
-    previous[8] = round_key[8] ^ round_key[4]
-    previous[9] = round_key[9] ^ round_key[5]
-    previous[10] = round_key[10] ^ round_key[6]
-    previous[11] = round_key[11] ^ round_key[7]
-    # Second Column
-    previous[4] = round_key[4] ^ round_key[0]
-    previous[5] = round_key[5] ^ round_key[1]
-    previous[6] = round_key[6] ^ round_key[2]
-    previous[7] = round_key[7] ^ round_key[3]
-    # First Column
-    # Step 1
-    sub_rot_Word = [SBOX[previous[13]],
-                    SBOX[previous[14]],
-                    SBOX[previous[15]],
-                    SBOX[previous[12]]]
-    # Step 2
-    previous[0] = round_constant[0] ^ round_key[0] ^ sub_rot_Word[0]
-    previous[1] = round_constant[1] ^ round_key[1] ^ sub_rot_Word[1]
-    previous[2] = round_constant[2] ^ round_key[2] ^ sub_rot_Word[2]
-    previous[3] = round_constant[3] ^ round_key[3] ^ sub_rot_Word[3]
-    return (previous)
+    return previous_round_key(round_key, rnd)
 
 
 def main():
@@ -119,6 +110,8 @@ def main():
     print("The round keys are :")
     while (len(round_keys) != 0):
         print(round_keys.pop())
+    print(DEFAULT_ORACLE.stats())
+    print(DEFAULT_ORACLE.oracle.stats())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+"""Integral attack on 5 rounds of AES with partial sums.
+
+The delta sets are balanced after 3 rounds. Each byte of that state is
+reached from the ciphertexts by inverting the last round on 4 bytes
+(one column of the state before it, 4 bytes of K5) and the 4th round on one
+byte, with the equivalent key k' = InvMixColumns(K4):
+
+    Y = INVSBOX[ sum_i INV_MIX[row][i] * INVSBOX[c[p_i] ^ k_i] ^ k' ]
+
+Following Ferguson et al., the sum is built one key byte at a time, each
+partial sum being reused for all the guesses of the next byte, and the last
+guess k' is checked for all its 256 values with one product over GF(2) of
+the parity of the partial sums.
+"""
+from itertools import product
+from random import Random
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from aes import key_schedule_128, inv_mix_one_column
+from aes_batch import encrypt_batch, INVSBOX_TABLE, INV_SHIFT_ROWS
+from alpha_oracle import AlphaSetOracle
+from attack import get_previous_round_key
+from gf import MUL
+from oracle import LocalOracle
+from utils import KEY
+
+ROUNDS = 5
+INV_MIX_ROWS = [[14, 11, 13, 9], [9, 14, 11, 13], [13, 9, 14, 11], [11, 13, 9, 14]]
+MUL_TABLE = np.array(MUL, dtype=np.uint8)
+# INVSBOX_BITS[v, 8 * k + b] = bit b of INVSBOX[v ^ k]
+INVSBOX_BITS = np.unpackbits(
+    INVSBOX_TABLE[np.bitwise_xor.outer(np.arange(256, dtype=np.uint8),
+                                       np.arange(256, dtype=np.uint8))][..., None],
+    axis=2, bitorder="little").reshape(256, 2048).astype(np.float32)
+ALL_GUESSES = np.arange(256, dtype=np.uint8)
+
+
+def column_positions(column: int) -> List[int]:
+    """Ciphertext bytes (and K5 bytes) mapped to one column by the inverse last round."""
+    return [int(INV_SHIFT_ROWS[4 * column + i]) for i in range(4)]
+
+
+def _balanced_last_guess(sums: np.ndarray) -> np.ndarray:
+    """For (G, N) partial sums, returns the (G, 256) mask of balanced k' guesses."""
+    n_guesses = sums.shape[0]
+    # Parity of the number of texts giving each value, per guess.
+    counts = np.bincount((np.arange(n_guesses)[:, None] * 256 + sums).ravel(),
+                         minlength=n_guesses * 256)
+    parity = (counts & 1).reshape(n_guesses, 256).astype(np.float32)
+    bits = (parity @ INVSBOX_BITS).astype(np.int64) & 1
+    return ~bits.reshape(n_guesses, 256, 8).any(axis=2)
+
+
+def balanced_candidates(ciphertexts: np.ndarray, column: int, row: int,
+                        guesses: Sequence[np.ndarray], chunk: int = 4096) -> np.ndarray:
+    """All the (k_0, k_1, k_2, k_3, k') guesses balancing one delta set.
+
+    guesses holds the candidate values of the 4 bytes of K5 at
+    column_positions(column). Returns an (n_candidates, 5) array.
+    """
+    ciphertexts = np.asarray(ciphertexts, dtype=np.uint8)
+    positions = column_positions(column)
+    # terms[i][g, t] = INV_MIX[row][i] * INVSBOX[c_t[p_i] ^ guesses[i][g]]
+    terms = [MUL_TABLE[INV_MIX_ROWS[row][i]][
+        INVSBOX_TABLE[guesses[i][:, None] ^ ciphertexts[None, :, positions[i]]]]
+        for i in range(4)]
+    # The sum is commutative, the bytes with the most guesses go last so the
+    # outer loop stays short and the inner stages are vectorized.
+    order = sorted(range(4), key=lambda i: len(guesses[i]))
+    candidates = []
+    for outer in product(range(len(guesses[order[0]])), range(len(guesses[order[1]]))):
+        partial = terms[order[0]][outer[0]] ^ terms[order[1]][outer[1]]
+        partial = partial[None, :] ^ terms[order[2]]
+        sums = (partial[:, None, :] ^ terms[order[3]][None, :, :]).reshape(-1, len(ciphertexts))
+        for start in range(0, len(sums), chunk):
+            for inner, last in np.argwhere(_balanced_last_guess(sums[start:start + chunk])):
+                inner = start + inner
+                indices = {order[0]: outer[0], order[1]: outer[1],
+                           order[2]: inner // len(guesses[order[3]]),
+                           order[3]: inner % len(guesses[order[3]])}
+                candidates.append([guesses[i][indices[i]] for i in range(4)] + [last])
+    return np.array(candidates, dtype=np.uint8).reshape(-1, 5)
+
+
+def filter_candidates(candidates: np.ndarray, ciphertexts: np.ndarray,
+                      column: int, row: int) -> np.ndarray:
+    """Keep the candidates also balancing another delta set."""
+    ciphertexts = np.asarray(ciphertexts, dtype=np.uint8)
+    sums = np.zeros((len(candidates), len(ciphertexts)), dtype=np.uint8)
+    for i, position in enumerate(column_positions(column)):
+        sums ^= MUL_TABLE[INV_MIX_ROWS[row][i]][
+            INVSBOX_TABLE[candidates[:, i, None] ^ ciphertexts[None, :, position]]]
+    balanced = np.bitwise_xor.reduce(INVSBOX_TABLE[sums ^ candidates[:, 4, None]], axis=1) == 0
+    return candidates[balanced]
+
+
+def attack_column(alpha_sets: AlphaSetOracle, column: int, known: Dict[int, int],
+                  rng: Random, row: int = 0, max_alpha_sets: int = 16) -> Tuple[List[int], int, int]:
+    """Recover the 4 bytes of K5 mapped to column, and one byte of InvMixColumns(K4).
+
+    known maps positions of K5 to their value, to attack a reduced key space.
+    Returns the 4 bytes, k' and the number of delta sets used.
+    """
+    positions = column_positions(column)
+    guesses = [np.array([known[p]], dtype=np.uint8) if p in known else ALL_GUESSES
+               for p in positions]
+    candidates = balanced_candidates(alpha_sets.ciphertexts(0), column, row, guesses)
+    n_alpha_sets = 1
+    while len(candidates) > 1 and n_alpha_sets < max_alpha_sets:
+        constant = [rng.randrange(256) for _ in range(16)]
+        candidates = filter_candidates(candidates, alpha_sets.ciphertexts(0, constant), column, row)
+        n_alpha_sets += 1
+    if len(candidates) != 1:
+        raise RuntimeError(f"{len(candidates)} candidates left for column {column} "
+                           f"after {n_alpha_sets} delta sets.")
+    return candidates[0, :4].tolist(), int(candidates[0, 4]), n_alpha_sets
+
+
+def recover_master_key(last_round_key: List[int]) -> List[int]:
+    """Walk the key schedule back from K5 to the master key."""
+    round_key = last_round_key
+    for rnd in range(ROUNDS - 1, -1, -1):
+        round_key = get_previous_round_key(round_key, rnd)
+    return round_key
+
+
+def attack(alpha_sets: AlphaSetOracle, known: Optional[Dict[int, int]] = None,
+           seed: int = 0) -> Tuple[List[int], List[float]]:
+    """Recover K5 column by column, returns it and the time spent per column."""
+    known = known or {}
+    rng = Random(seed)
+    last_round_key = [0] * 16
+    times = []
+    for column in range(4):
+        start = perf_counter()
+        key_bytes, _, _ = attack_column(alpha_sets, column, known, rng)
+        times.append(perf_counter() - start)
+        for position, byte in zip(column_positions(column), key_bytes):
+            last_round_key[position] = byte
+    return last_round_key, times
+
+
+def main():
+    """Attack 5 rounds with 1 and 2 unknown bytes of K5 per column, and time it."""
+    schedule = key_schedule_128(KEY, ROUNDS)
+    oracle = LocalOracle(KEY, ROUNDS)
+    alpha_sets = AlphaSetOracle(oracle)
+    # k' of column 0, row 0 is the first byte of InvMixColumns(K4).
+    _, k_prime, _ = attack_column(alpha_sets, 0, {p: schedule[5][p] for p in column_positions(0)[:3]},
+                                  Random(0))
+    assert k_prime == inv_mix_one_column(schedule[4][:4])[0]
+    for unknown in (1, 2):
+        known = {p: schedule[5][p] for column in range(4)
+                 for p in column_positions(column)[unknown:]}
+        last_round_key, times = attack(alpha_sets, known)
+        master_key = recover_master_key(last_round_key)
+        assert last_round_key == schedule[5] and master_key == KEY
+        plaintext = [[0x32, 0x43, 0xF6, 0xA8, 0x88, 0x5A, 0x30, 0x8D,
+                      0x31, 0x31, 0x98, 0xA2, 0xE0, 0x37, 0x07, 0x34]]
+        assert encrypt_batch(plaintext, master_key, ROUNDS).tolist() == oracle.encrypt(plaintext)
+        print(f"{unknown} unknown byte(s) of K5 per column: "
+              + ", ".join(f"{t:.3f}s" for t in times) + f", total {sum(times):.3f}s")
+    print(f"Master key {bytes(master_key).hex()}")
+    print(alpha_sets.stats())
+    print(oracle.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Throughput of the AES implementations of project1, in blocks per second."""
+from random import Random
+from time import perf_counter
+from typing import Callable, List
+
+import aes
+import key_schedule
+from aes import inv_mix_one_column, mix_one_column
+from aes_ttable import (BACKENDS, decrypt_words, decryption_round_keys, encrypt_words,
+                        encryption_round_keys, to_words)
+from utils import KEY
+
+
+def blocks_per_second(function: Callable[[List[int]], List[int]], blocks: List[List[int]]) -> float:
+    """Runs function on every block and returns its throughput."""
+    start = perf_counter()
+    for block in blocks:
+        function(block)
+    return len(blocks) / (perf_counter() - start)
+
+
+def random_blocks(n_blocks: int, seed: int = 0) -> List[List[int]]:
+    """Returns n_blocks random 16 byte blocks."""
+    rng = Random(seed)
+    return [[rng.randrange(256) for _ in range(16)] for _ in range(n_blocks)]
+
+
+def benchmark_backends(n_blocks: int = 2000):
+    """Single block encryption and decryption throughput of every backend.
+
+    Both backends cache their round keys per key, the last line shows the
+    T-tables alone with the word keys passed in directly.
+    """
+    blocks = random_blocks(n_blocks)
+    print(f"{'backend':<20}{'encrypt':>12}{'decrypt':>12}  (blocks/s)")
+    for name, (encrypt, decrypt) in BACKENDS.items():
+        encryption = blocks_per_second(lambda block: encrypt(block, KEY), blocks)
+        decryption = blocks_per_second(lambda block: decrypt(block, KEY), blocks)
+        print(f"{name:<20}{encryption:>12.0f}{decryption:>12.0f}")
+    word_blocks = [to_words(block) for block in blocks]
+    encryption_keys = encryption_round_keys(KEY)
+    decryption_keys = decryption_round_keys(KEY)
+    encryption = blocks_per_second(lambda words: encrypt_words(words, encryption_keys), word_blocks)
+    decryption = blocks_per_second(lambda words: decrypt_words(words, decryption_keys), word_blocks)
+    print(f"{'ttable, words':<20}{encryption:>12.0f}{decryption:>12.0f}")
+
+
+def benchmark_cipher(n_blocks: int = 2000):
+    """Per block cost of aes.encrypt/decrypt with and without the cached key expansion."""
+    blocks = random_blocks(n_blocks)
+
+    def uncached(function):
+        def run(block):
+            key_schedule._expand_key.cache_clear()
+            aes._cipher.cache_clear()
+            return function(block, KEY)
+        return run
+
+    cipher = aes.AES(KEY)
+    rows = [
+        ("schedule per block", uncached(aes.encrypt), uncached(aes.decrypt)),
+        ("cached schedule", lambda block: aes.encrypt(block, KEY),
+         lambda block: aes.decrypt(block, KEY)),
+        ("AES object", cipher.encrypt_block, cipher.decrypt_block),
+    ]
+    print(f"{'aes.py':<20}{'encrypt':>12}{'decrypt':>12}  (us/block)")
+    for name, encrypt, decrypt in rows:
+        encryption = 1e6 / blocks_per_second(encrypt, blocks)
+        decryption = 1e6 / blocks_per_second(decrypt, blocks)
+        print(f"{name:<20}{encryption:>12.1f}{decryption:>12.1f}")
+
+
+def benchmark_mix_columns(n_columns: int = 20000):
+    """Throughput of MixColumns and its inverse on one column, in columns per second."""
+    columns = [block[:4] for block in random_blocks(n_columns)]
+    mix = blocks_per_second(mix_one_column, columns)
+    inv_mix = blocks_per_second(inv_mix_one_column, columns)
+    print(f"{'mix_one_column':<20}{mix:>12.0f}  (columns/s)")
+    print(f"{'inv_mix_one_column':<20}{inv_mix:>12.0f}  (columns/s)")
+
+
+if __name__ == "__main__":
+    benchmark_backends()
+    benchmark_cipher()
+    benchmark_mix_columns()
@@ -0,0 +1,35 @@
+"""Arithmetic in GF(2^8) with the Rijndael polynomial, through tables built at import."""
+from typing import List
+
+POLYNOMIAL = 0x11B
+
+
+def multiply(a: int, b: int) -> int:
+    """Multiply two bytes in GF(2^8), bit by bit."""
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a <<= 1
+        if a & 0x100:
+            a ^= POLYNOMIAL
+        b >>= 1
+    return result
+
+
+# MUL[a][b] = a * b
+MUL: List[List[int]] = [[multiply(a, b) for b in range(256)] for a in range(256)]
+
+# Rows of MUL for the constants of MixColumns and its inverse.
+MUL2 = MUL[2]
+MUL3 = MUL[3]
+MUL9 = MUL[9]
+MUL11 = MUL[11]
+MUL13 = MUL[13]
+MUL14 = MUL[14]
+
+
+if __name__ == "__main__":
+    assert MUL2[0x80] == 0x1B
+    assert MUL[0x57][0x83] == 0xC1  # FIPS-197 section 4.2
+    assert all(MUL[a][b] == MUL[b][a] for a in range(256) for b in range(256))
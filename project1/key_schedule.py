@@ -0,0 +1,146 @@
+"""The AES-128 key schedule, cached per key, and its inversion from any round key.
+
+Round keys are computed once per (key, rounds) and shared by every call. The
+inversion works on a single round key or on (N, 16) NumPy arrays of candidate
+round keys, so all the candidates left by an attack are checked at once.
+"""
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+import numpy as np
+
+from gf import MUL2
+from sbox import SBOX
+
+# RCON[i] is the round constant used to compute round key i + 1.
+RCON = [1]
+for _ in range(31):
+    RCON.append(MUL2[RCON[-1]])
+
+SBOX_TABLE = np.array(SBOX, dtype=np.uint8)
+RCON_TABLE = np.array(RCON, dtype=np.uint8)
+# RotWord of the last word of a round key.
+ROT_WORD = [13, 14, 15, 12]
+
+RoundKeys = Tuple[Tuple[int, ...], ...]
+
+
+def next_round_key(round_key: Sequence[int], rnd: int) -> List[int]:
+    """Round key rnd + 1 from round key rnd."""
+    following = [round_key[i] ^ SBOX[round_key[ROT_WORD[i]]] for i in range(4)]
+    following[0] ^= RCON[rnd]
+    for i in range(4, 16):
+        following.append(following[i - 4] ^ round_key[i])
+    return following
+
+
+def previous_round_key(round_key: Sequence[int], rnd: int) -> List[int]:
+    """Round key rnd from round key rnd + 1."""
+    previous = [0] * 4 + [round_key[i] ^ round_key[i - 4] for i in range(4, 16)]
+    for i in range(4):
+        previous[i] = round_key[i] ^ SBOX[previous[ROT_WORD[i]]]
+    previous[0] ^= RCON[rnd]
+    return previous
+
+
+@lru_cache(maxsize=1024)
+def _expand_key(key: Tuple[int, ...], rounds: int) -> RoundKeys:
+    round_keys = [key]
+    for rnd in range(rounds):
+        round_keys.append(tuple(next_round_key(round_keys[-1], rnd)))
+    return tuple(round_keys)
+
+
+def expand_key(key: Sequence[int], rounds: int) -> RoundKeys:
+    """The rounds + 1 round keys of key, computed once per key and shared between calls."""
+    return _expand_key(tuple(key), rounds)
+
+
+def invert_key_schedule(round_key: Sequence[int], rnd: int) -> List[int]:
+    """The master key giving round_key as round key rnd."""
+    key = list(round_key)
+    for previous in range(rnd - 1, -1, -1):
+        key = previous_round_key(key, previous)
+    return key
+
+
+def next_round_keys(round_keys: np.ndarray, rnd: int) -> np.ndarray:
+    """next_round_key on (N, 16) round keys."""
+    following = np.empty_like(round_keys)
+    following[:, :4] = round_keys[:, :4] ^ SBOX_TABLE[round_keys[:, ROT_WORD]]
+    following[:, 0] ^= RCON_TABLE[rnd]
+    for i in range(4, 16, 4):
+        following[:, i:i + 4] = following[:, i - 4:i] ^ round_keys[:, i:i + 4]
+    return following
+
+
+def previous_round_keys(round_keys: np.ndarray, rnd: int) -> np.ndarray:
+    """previous_round_key on (N, 16) round keys."""
+    previous = np.empty_like(round_keys)
+    previous[:, 4:] = round_keys[:, 4:] ^ round_keys[:, :-4]
+    previous[:, :4] = round_keys[:, :4] ^ SBOX_TABLE[previous[:, ROT_WORD]]
+    previous[:, 0] ^= RCON_TABLE[rnd]
+    return previous
+
+
+def expand_keys(keys, rounds: int) -> np.ndarray:
+    """The (N, rounds + 1, 16) round keys of (N, 16) master keys."""
+    round_keys = [np.asarray(keys, dtype=np.uint8).reshape(-1, 16)]
+    for rnd in range(rounds):
+        round_keys.append(next_round_keys(round_keys[-1], rnd))
+    return np.stack(round_keys, axis=1)
+
+
+def invert_key_schedules(round_keys, rnd: int) -> np.ndarray:
+    """The (N, 16) master keys giving the (N, 16) candidates as round key rnd."""
+    keys = np.asarray(round_keys, dtype=np.uint8).reshape(-1, 16)
+    for previous in range(rnd - 1, -1, -1):
+        keys = previous_round_keys(keys, previous)
+    return keys
+
+
+def matching_round_keys(candidates, rnd: int, plaintexts, ciphertexts, rounds: int) -> np.ndarray:
+    """Mask of the candidates for round key rnd that encrypt plaintexts to ciphertexts.
+
+    Every candidate is inverted to its master key, and all of them encrypt
+    the (P, 16) plaintexts through rounds rounds in one batch.
+    """
+    from aes_batch import SHIFT_ROWS, mix_columns
+    schedules = expand_keys(invert_key_schedules(candidates, rnd), rounds)
+    plaintexts = np.asarray(plaintexts, dtype=np.uint8).reshape(1, -1, 16)
+    n_candidates, n_texts = len(schedules), plaintexts.shape[1]
+    states = plaintexts ^ schedules[:, None, 0]
+    for i in range(1, rounds):
+        states = SBOX_TABLE[states][..., SHIFT_ROWS].reshape(-1, 16)
+        states = mix_columns(states).reshape(n_candidates, n_texts, 16) ^ schedules[:, None, i]
+    states = SBOX_TABLE[states][..., SHIFT_ROWS] ^ schedules[:, None, rounds]
+    expected = np.asarray(ciphertexts, dtype=np.uint8).reshape(1, -1, 16)
+    return (states == expected).all(axis=(1, 2))
+
+
+def main():
+    """Check the inversions against the forward schedule."""
+    from utils import KEY
+    # FIPS-197 appendix A.1, last round key of AES-128.
+    assert bytes(expand_key(KEY, 10)[10]).hex() == "d014f9a8c9ee2589e13f0cc8b6630ca6"
+    assert RCON[:10] == [0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36]
+    assert expand_key(list(KEY), 10) is expand_key(KEY, 10)
+    for rnd in range(11):
+        assert invert_key_schedule(expand_key(KEY, 10)[rnd], rnd) == KEY
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 256, (100, 16), dtype=np.uint8)
+    schedules = expand_keys(keys, 10)
+    assert schedules[7].tolist() == [list(round_key) for round_key in expand_key(keys[7].tolist(), 10)]
+    for rnd in range(11):
+        assert (invert_key_schedules(schedules[:, rnd], rnd) == keys).all()
+    # Only the right candidate for round key 5 survives a known encryption.
+    from aes_batch import encrypt_batch
+    plaintexts = rng.integers(0, 256, (2, 16), dtype=np.uint8)
+    ciphertexts = encrypt_batch(plaintexts, KEY, rounds=5)
+    candidates = rng.integers(0, 256, (1000, 16), dtype=np.uint8)
+    candidates[123] = expand_key(KEY, 5)[5]
+    mask = matching_round_keys(candidates, 5, plaintexts, ciphertexts, rounds=5)
+    assert np.flatnonzero(mask).tolist() == [123]
+
+
+if __name__ == "__main__":
+    main()
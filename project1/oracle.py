@@ -0,0 +1,222 @@
+"""Chosen plaintext oracles, the only way the attack gets ciphertexts.
+
+Every oracle encrypts batches of plaintexts under a key the attack does not
+see, and accounts for the number of queries, the batch sizes and the time
+spent waiting on it. Batching is what makes slow targets affordable: a
+subprocess or a remote device pays its round trip once per batch.
+"""
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+from abc import ABC, abstractmethod
+from time import perf_counter, sleep
+from typing import List, Optional, Tuple
+
+import aes
+from aes_batch import encrypt_batch
+
+
+class Oracle(ABC):
+    """Base class of the oracles, subclasses implement cache_id and _encrypt."""
+
+    def __init__(self):
+        self.queries = 0
+        self.batch_sizes: List[int] = []
+        self.wait_time = 0.0
+
+    @property
+    @abstractmethod
+    def cache_id(self) -> Optional[str]:
+        """Identifies the key and cipher behind the oracle, for caches of its answers.
+
+        None when the oracle cannot tell, its answers are then not cached on disk.
+        """
+
+    @abstractmethod
+    def _encrypt(self, plaintexts: List[List[int]]) -> List[List[int]]:
+        """Encrypt a batch, without the accounting."""
+
+    def encrypt(self, plaintexts: List[List[int]]) -> List[List[int]]:
+        """Encrypt a batch of 16 byte plaintexts."""
+        start = perf_counter()
+        ciphertexts = self._encrypt(plaintexts)
+        self.wait_time += perf_counter() - start
+        self.queries += len(plaintexts)
+        self.batch_sizes.append(len(plaintexts))
+        return ciphertexts
+
+    def stats(self) -> str:
+        """Summary of the accounting."""
+        largest = max(self.batch_sizes, default=0)
+        return (f"{self.queries} plaintexts queried in {len(self.batch_sizes)} batches "
+                f"(largest {largest}), {self.wait_time:.3f}s waiting on the oracle")
+
+    def close(self):
+        """Release the resources of the oracle."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalOracle(Oracle):
+    """Encrypts in process, rounds defaults to aes.ROUNDS at query time."""
+
+    def __init__(self, key: List[int], rounds: Optional[int] = None):
+        super().__init__()
+        self._key = list(key)
+        self._rounds = rounds
+
+    @property
+    def cache_id(self) -> str:
+        rounds = aes.ROUNDS if self._rounds is None else self._rounds
+        return f"local:{bytes(self._key).hex()}:{rounds}"
+
+    def _encrypt(self, plaintexts: List[List[int]]) -> List[List[int]]:
+        return encrypt_batch(plaintexts, self._key, self._rounds).tolist()
+
+
+class SubprocessOracle(Oracle):
+    """Encrypts in a child process, one line of hex per batch on its stdin and stdout."""
+
+    def __init__(self, key: List[int], rounds: Optional[int] = None):
+        super().__init__()
+        self._rounds = aes.ROUNDS if rounds is None else rounds
+        self._id = f"subprocess:{bytes(key).hex()}:{self._rounds}"
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve-stdio",
+             "--key", bytes(key).hex(), "--rounds", str(self._rounds)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+    @property
+    def cache_id(self) -> str:
+        return self._id
+
+    def _encrypt(self, plaintexts: List[List[int]]) -> List[List[int]]:
+        self._process.stdin.write(_pack(plaintexts).hex() + "\n")
+        self._process.stdin.flush()
+        return _unpack(bytes.fromhex(self._process.stdout.readline().strip()))
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+
+
+class SocketOracle(Oracle):
+    """Talks to a device over TCP, each message is a 4 byte length then the blocks.
+
+    The address says nothing of the key of the device, so cache_id is only
+    known when the caller gives one naming the device and its key.
+    """
+
+    def __init__(self, address: Tuple[str, int], cache_id: Optional[str] = None):
+        super().__init__()
+        self._id = cache_id
+        self._socket = socket.create_connection(address)
+
+    @property
+    def cache_id(self) -> Optional[str]:
+        return self._id
+
+    def _encrypt(self, plaintexts: List[List[int]]) -> List[List[int]]:
+        _send(self._socket, _pack(plaintexts))
+        return _unpack(_receive(self._socket))
+
+    def close(self):
+        self._socket.close()
+
+
+def _pack(blocks: List[List[int]]) -> bytes:
+    return b"".join(bytes(block) for block in blocks)
+
+
+def _unpack(data: bytes) -> List[List[int]]:
+    return [list(data[i:i + 16]) for i in range(0, len(data), 16)]
+
+
+def _send(connection: socket.socket, payload: bytes):
+    connection.sendall(struct.pack(">I", len(payload)) + payload)
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by the oracle.")
+        data += chunk
+    return data
+
+
+def _receive(connection: socket.socket) -> bytes:
+    size, = struct.unpack(">I", _receive_exactly(connection, 4))
+    return _receive_exactly(connection, size)
+
+
+def start_device(key: List[int], rounds: Optional[int] = None, latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0) -> socketserver.ThreadingTCPServer:
+    """Serve encryptions on a local socket, as a stand-in for a remote device.
+
+    Every batch is answered after latency seconds. The server runs in a
+    daemon thread, its address is server.server_address, stop it with
+    server.shutdown().
+    """
+    rounds = aes.ROUNDS if rounds is None else rounds
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            while True:
+                try:
+                    plaintexts = _unpack(_receive(self.request))
+                except ConnectionError:
+                    return
+                sleep(latency)
+                _send(self.request, _pack(encrypt_batch(plaintexts, key, rounds).tolist()))
+
+    server = socketserver.ThreadingTCPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_stdio(key: List[int], rounds: int):
+    """Answer the batches of a SubprocessOracle until stdin is closed."""
+    for line in sys.stdin:
+        plaintexts = _unpack(bytes.fromhex(line.strip()))
+        print(_pack(encrypt_batch(plaintexts, key, rounds).tolist()).hex(), flush=True)
+
+
+def main():
+    """Check that the three oracles answer the same."""
+    from utils import KEY
+    plaintexts = [[i] * 16 for i in range(256)]
+    expected = [aes.encrypt(plaintext, KEY) for plaintext in plaintexts]
+    server = start_device(KEY, latency=0.01)
+    oracles = [LocalOracle(KEY), SubprocessOracle(KEY), SocketOracle(server.server_address)]
+    for oracle in oracles:
+        with oracle:
+            assert oracle.encrypt(plaintexts[:128]) + oracle.encrypt(plaintexts[128:]) == expected
+            assert oracle.queries == 256 and oracle.batch_sizes == [128, 128]
+            print(f"{type(oracle).__name__}: {oracle.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chosen plaintext oracles.")
+    parser.add_argument("--serve-stdio", action="store_true",
+                        help="answer a SubprocessOracle on stdin/stdout")
+    parser.add_argument("--key", help="hex key to serve")
+    parser.add_argument("--rounds", type=int)
+    args = parser.parse_args()
+    if args.serve_stdio:
+        serve_stdio(list(bytes.fromhex(args.key)), args.rounds)
+    else:
+        main()
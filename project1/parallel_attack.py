@@ -0,0 +1,102 @@
+"""Square attack with the 16 bytes of the last round key guessed in parallel."""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from random import Random
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Tuple
+
+from alpha_oracle import AlphaSetOracle
+from attack import guess_round_key_byte
+from oracle import LocalOracle, Oracle, SocketOracle, start_device
+from utils import KEY
+
+
+class ByteResult(NamedTuple):
+    """Outcome of the attack on one byte of the last round key."""
+    position: int
+    key: int
+    # Candidates left after each delta set.
+    candidates: List[int]
+    seconds: float
+    # Delta sets queried from the oracle, the others came from the cache.
+    computed: int
+    oracle_queries: int
+    oracle_wait: float
+
+
+def attack_byte(position: int, seed: int, cache_dir: Optional[str] = None,
+                device: Optional[Tuple[str, int]] = None,
+                device_id: Optional[str] = None) -> ByteResult:
+    """Guess one byte, the extra delta sets are drawn from an RNG seeded per position.
+
+    The ciphertexts come from the socket device at address device if given,
+    from an in-process oracle otherwise. device_id names the device and its
+    key in the disk cache, so it is required with cache_dir.
+    """
+    if device is not None and cache_dir is not None and device_id is None:
+        raise ValueError("A device_id identifying the device and its key is required "
+                         "to cache its delta sets in cache_dir.")
+    start = perf_counter()
+    oracle: Oracle = LocalOracle(KEY) if device is None else SocketOracle(device, device_id)
+    with oracle:
+        alpha_sets = AlphaSetOracle(oracle, cache_dir=cache_dir)
+        key, candidates = guess_round_key_byte(position, Random(seed * 16 + position), alpha_sets)
+    return ByteResult(position, key, candidates, perf_counter() - start, alpha_sets.computed,
+                      oracle.queries, oracle.wait_time)
+
+
+def parallel_guess_last_round_key(seed: int = 0, max_workers: Optional[int] = None,
+                                  threads: bool = False, cache_dir: Optional[str] = None,
+                                  device: Optional[Tuple[str, int]] = None,
+                                  device_id: Optional[str] = None
+                                  ) -> Tuple[List[int], List[ByteResult]]:
+    """Guess the last round key with one task per byte, over processes or threads.
+
+    The result only depends on seed, whatever the scheduling of the tasks.
+    Delta sets are shared between tasks and runs through cache_dir if given,
+    a device also needs a device_id then.
+    """
+    pool: Executor = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers)
+    with pool as executor:
+        results = list(executor.map(attack_byte, range(16), [seed] * 16, [cache_dir] * 16,
+                                    [device] * 16, [device_id] * 16))
+    return [result.key for result in results], results
+
+
+def print_report(results: List[ByteResult]):
+    """Prints the per byte outcome of the attack."""
+    print("byte  key  delta sets  queried  candidates  oracle queries  oracle wait  seconds")
+    for result in results:
+        candidates = " -> ".join(str(count) for count in result.candidates)
+        print(f"{result.position:>4}  {result.key:>3}  {len(result.candidates):>10}  "
+              f"{result.computed:>7}  {candidates:<10}  {result.oracle_queries:>14}  "
+              f"{result.oracle_wait:>11.3f}  {result.seconds:>7.3f}")
+
+
+def main():
+    "Find the last round key in parallel and check it is reproducible."
+    start = perf_counter()
+    key, results = parallel_guess_last_round_key(seed=2255)
+    elapsed = perf_counter() - start
+    print_report(results)
+    print(f"Last round key {key} found in {elapsed:.3f}s")
+    assert parallel_guess_last_round_key(seed=2255, threads=True)[0] == key
+    # Against a simulated remote device answering each batch in 50ms.
+    server = start_device(KEY, latency=0.05)
+    start = perf_counter()
+    remote_key, results = parallel_guess_last_round_key(seed=2255, threads=True,
+                                                        device=server.server_address)
+    server.shutdown()
+    print_report(results)
+    print(f"Last round key found on the device in {perf_counter() - start:.3f}s")
+    assert remote_key == key
+    try:
+        parallel_guess_last_round_key(seed=2255, threads=True, cache_dir="alpha_sets",
+                                      device=server.server_address)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a device without device_id must not use the disk cache")
+
+
+if __name__ == "__main__":
+    main()
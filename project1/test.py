@@ -1,4 +1,6 @@
-from attack import get_previous_round_key
+from attack import (get_previous_round_key, balanced_guesses, check_guess,
+                    create_encrypt_alpha_set, reverse_last_round_on_byte)
+from aes import shift_rows
 from aes import key_schedule_128
 from utils import KEY
 
@@ -14,6 +16,21 @@ def main():
     assert schedule[-4] == previous
     previous = get_previous_round_key(schedule[-4], 0)
     assert KEY == previous
+    # Rounds 9 and 10 use the round constants 0x1B and 0x36.
+    schedule = key_schedule_128(KEY, 10)
+    assert get_previous_round_key(schedule[10], 9) == schedule[9]
+    assert get_previous_round_key(schedule[9], 8) == schedule[8]
+    # The partial decryption table agrees with the byte by byte reversal.
+    cipher_alpha_set = create_encrypt_alpha_set(5)
+    round_key = [0] * 16
+    expected = []
+    for guess in range(256):
+        round_key[5] = guess
+        reversed_set = [shift_rows(reverse_last_round_on_byte(ciphertext, round_key))
+                        for ciphertext in cipher_alpha_set]
+        if check_guess(reversed_set, 5):
+            expected.append(guess)
+    assert balanced_guesses(cipher_alpha_set, 5) == expected
 
 
 if __name__ == "__main__":
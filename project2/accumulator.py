@@ -0,0 +1,120 @@
+from typing import Iterable, Optional, Tuple
+import numpy as np
+
+from utils import read_inputs, iter_traces
+from attack import compute_h
+
+
+class CPAAccumulator:
+    """Online CPA, keeps running sums per key guess and per sample.
+
+    Memory is O(256 x n_samples) whatever the number of traces fed to it.
+    """
+
+    def __init__(self, n_samples: Optional[int] = None, model: str = "hamming_weight"):
+        self.model = model
+        self.n_traces = 0
+        self.n_samples = n_samples
+        self.sum_h = np.zeros(256)
+        self.sum_h2 = np.zeros(256)
+        self.sum_t = None
+        self.sum_t2 = None
+        self.sum_ht = None
+        if n_samples is not None:
+            self._allocate(n_samples)
+
+    def _allocate(self, n_samples: int):
+        """Allocates the per sample sums."""
+        self.n_samples = n_samples
+        self.sum_t = np.zeros(n_samples)
+        self.sum_t2 = np.zeros(n_samples)
+        self.sum_ht = np.zeros((256, n_samples))
+
+    def update(self, plaintexts: Iterable[int], traces) -> "CPAAccumulator":
+        """Adds a batch of plaintexts and their (n_traces, n_samples) traces."""
+        traces = np.asarray(traces, dtype=np.float64)
+        h = compute_h(list(plaintexts), self.model).astype(np.float64)
+        if h.shape[0] != traces.shape[0]:
+            raise ValueError(
+                f"{h.shape[0]} plaintexts for {traces.shape[0]} traces.")
+        if self.sum_ht is None:
+            self._allocate(traces.shape[1])
+        elif traces.shape[1] != self.n_samples:
+            raise ValueError(
+                f"Expected {self.n_samples} samples, got {traces.shape[1]}.")
+        self.n_traces += traces.shape[0]
+        self.sum_h += h.sum(axis=0)
+        self.sum_h2 += (h**2).sum(axis=0)
+        self.sum_t += traces.sum(axis=0)
+        self.sum_t2 += (traces**2).sum(axis=0)
+        self.sum_ht += h.T @ traces
+        return self
+
+    def merge(self, other: "CPAAccumulator") -> "CPAAccumulator":
+        """Adds the sums of another accumulator, e.g. computed on another machine."""
+        if other.model != self.model:
+            raise ValueError(f"Cannot merge {other.model} sums into {self.model} sums.")
+        if other.sum_ht is None:
+            return self
+        if self.sum_ht is None:
+            self._allocate(other.n_samples)
+        elif other.n_samples != self.n_samples:
+            raise ValueError(
+                f"Expected {self.n_samples} samples, got {other.n_samples}.")
+        self.n_traces += other.n_traces
+        self.sum_h += other.sum_h
+        self.sum_h2 += other.sum_h2
+        self.sum_t += other.sum_t
+        self.sum_t2 += other.sum_t2
+        self.sum_ht += other.sum_ht
+        return self
+
+    def __iadd__(self, other: "CPAAccumulator") -> "CPAAccumulator":
+        return self.merge(other)
+
+    def correlation_matrix(self) -> np.ndarray:
+        """Computes the (256, n_samples) correlation matrix of the traces seen so far."""
+        n = self.n_traces
+        numerator = n * self.sum_ht - np.outer(self.sum_h, self.sum_t)
+        var_h = n * self.sum_h2 - self.sum_h**2
+        var_t = n * self.sum_t2 - self.sum_t**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlations = numerator / np.sqrt(np.outer(var_h, var_t))
+        return np.nan_to_num(correlations, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def best_key(self) -> Tuple[int, int, float]:
+        """Returns the current most likely key, its peak sample and coefficient."""
+        correlations = np.abs(self.correlation_matrix())
+        key, sample = np.unravel_index(np.argmax(correlations),
+                                       correlations.shape)
+        return int(key), int(sample), float(correlations[key, sample])
+
+
+def streaming_attack(inputs_filename: str = './traces/inputs_test.dat',
+                     traces_filename: str = './traces/T_test.dat',
+                     batch_size: int = 100, model: str = "hamming_weight") -> Tuple[float, int]:
+    """Same as attack() but only holds batch_size traces in memory at once."""
+    plaintexts = read_inputs(inputs_filename)
+    accumulator = CPAAccumulator(model=model)
+    start = 0
+    for batch in iter_traces(traces_filename, batch_size):
+        stop = start + len(batch)
+        accumulator.update(plaintexts[start:stop], batch.to_numpy())
+        start = stop
+    key, _, coef = accumulator.best_key()
+    return coef, key
+
+
+if __name__ == "__main__":
+    from attack import attack
+    coef, key = streaming_attack(batch_size=64)
+    assert key == 203
+    assert abs(coef - attack()[0]) < 1e-9
+    # Two partial accumulators merged must match a single pass.
+    plaintexts = read_inputs('./traces/inputs_test.dat')
+    batches = list(iter_traces('./traces/T_test.dat', 300))
+    left = CPAAccumulator().update(plaintexts[:300], batches[0].to_numpy())
+    right = CPAAccumulator().update(plaintexts[300:], batches[1].to_numpy())
+    left += right
+    assert left.best_key()[0] == 203
+    assert abs(left.best_key()[2] - coef) < 1e-9
@@ -1,58 +1,66 @@
-from math import sqrt
 from typing import List, Tuple
 import numpy as np
-import pandas as pd
 
-from numpy import average
 from utils import read_inputs, read_traces
-from aes import encrypt
+import leakage
 
 
-def gen_h(trace_file: str = "./traces/inputs7.dat") -> List[List[int]]:
+def gen_h(trace_file: str = "./traces/inputs7.dat", model: str = "hamming_weight") -> np.ndarray:
     """Generates the H matrix."""
-    h = []
-    for plaintext in read_inputs(trace_file):
-        line = []
-        for key in range(256):
-            line.append(encrypt(plaintext, key))
-        h.append(line)
-    return np.array(h)
-
-
-def compute_correlation_coefficient(h: List[int], traces: pd.DataFrame) -> int:
-    """Given an H matrix column and traces generates the Pearson correlation coefficient."""
-    avg_h = average(h)
-    coefficient_over_time = []
-    # Iterate over all timestamps in the traces to find
-    #  the one where the encryption happens.
-    for column in traces:
-        trace = traces[column]
-        avg_t = trace.mean()
-        numerator = 0
-        denominator_left = 0
-        denominator_right = 0
-        for i, element in enumerate(trace):
-            numerator += (h[i] - avg_h)*(element-avg_t)
-            denominator_left += (h[i] - avg_h)**2
-            denominator_right += (element-avg_t)**2
-        denominator = sqrt(denominator_left*denominator_right)
-        coefficient_over_time.append(abs(numerator/denominator))
-    return max(coefficient_over_time)
-
-
-def attack(inputs_filename: str = './traces/inputs_test.dat', traces_filename: str = './traces/T_test.dat') -> Tuple[int, int]:
-    """Given input and corresponding traces, try a differencial power analysis."""
-    h = gen_h(inputs_filename)
+    return compute_h(read_inputs(trace_file), model)
+
+
+def compute_h(plaintexts: List[int], model: str = "hamming_weight") -> np.ndarray:
+    """Generates the H matrix of a list of plaintext bytes."""
+    return leakage.compute_h(plaintexts, model)
+
+
+def correlation_matrix(h: np.ndarray, traces: np.ndarray) -> np.ndarray:
+    """Computes the Pearson correlation of every key guess against every sample.
+
+    h is the (n_traces, 256) H matrix and traces the (n_traces, n_samples)
+    trace matrix, the result is the (256, n_samples) correlation matrix.
+    """
+    h_centered = h - h.mean(axis=0)
+    traces_centered = traces - traces.mean(axis=0)
+    numerator = h_centered.T @ traces_centered
+    denominator = np.sqrt(np.outer((h_centered**2).sum(axis=0),
+                                   (traces_centered**2).sum(axis=0)))
+    # Constant samples (or guesses) carry no information, score them 0.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlations = numerator / denominator
+    return np.nan_to_num(correlations, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def cpa(h: np.ndarray, traces: np.ndarray) -> Tuple[int, int, np.ndarray]:
+    """Scores all the key guesses against all the samples in one pass.
+
+    Returns the most likely key, the sample where its correlation peaks and
+    the full correlation matrix.
+    """
+    correlations = correlation_matrix(np.asarray(h, dtype=np.float64),
+                                      np.asarray(traces, dtype=np.float64))
+    key, sample = np.unravel_index(np.argmax(np.abs(correlations)),
+                                   correlations.shape)
+    return int(key), int(sample), correlations
+
+
+def key_rank(correlations: np.ndarray, key: int) -> int:
+    """Rank of key among the 256 guesses, 1 meaning it is the best guess."""
+    scores = np.abs(correlations).max(axis=1)
+    return int(np.sum(scores > scores[key])) + 1
+
+
+def attack(inputs_filename: str = './traces/inputs_test.dat', traces_filename: str = './traces/T_test.dat',
+           model: str = "hamming_weight") -> Tuple[int, int]:
+    """Given input and corresponding traces, try a differencial power analysis.
+
+    model is the name of the leakage model, see leakage.LEAKAGE_MODELS.
+    """
+    h = gen_h(inputs_filename, model)
     traces = read_traces(traces_filename)
-    max_coef = 0
-    most_likely_key = 0
-    # Iterrate over all possible keys.
-    for key in range(256):
-        coef = compute_correlation_coefficient(h[:, key], traces)
-        if coef > max_coef:
-            most_likely_key = key
-            max_coef = coef
-    return max_coef, most_likely_key
+    key, sample, correlations = cpa(h, traces.to_numpy())
+    return float(abs(correlations[key, sample])), key
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+"""Attack efficiency and throughput as a function of the number of traces.
+
+For every trace count, the attack is run on many random subsets of the traces
+and the success rate, guessing entropy (mean rank of the correct key) and key
+ranks are written as a CSV table, together with the time spent loading the
+files, generating H and computing the correlation.
+
+Example: python benchmark.py --counts 25 50 100 200 --permutations 200 --output bench.csv
+"""
+import argparse
+import csv
+import sys
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+from attack import attack, compute_h, cpa, key_rank
+from utils import read_inputs, read_traces
+
+COLUMNS = ["traces", "permutations", "success_rate", "guessing_entropy", "median_rank",
+           "max_rank", "load_time", "h_time", "correlation_time"]
+
+
+def benchmark(inputs_filename: str = './traces/inputs_test.dat',
+              traces_filename: str = './traces/T_test.dat',
+              key: Optional[int] = None, counts: Optional[Sequence[int]] = None,
+              n_permutations: int = 100, seed: int = 0,
+              model: str = "hamming_weight") -> List[Dict[str, float]]:
+    """Returns one row of COLUMNS per trace count.
+
+    If key is not given, the key found with all the traces is used as the
+    correct one. h_time and correlation_time are the mean time of one attack.
+    """
+    start = perf_counter()
+    plaintexts = np.array(read_inputs(inputs_filename))
+    traces = read_traces(traces_filename).to_numpy()
+    load_time = perf_counter() - start
+    if key is None:
+        _, key = attack(inputs_filename, traces_filename, model)
+    if counts is None:
+        counts = [count for count in (10, 25, 50, 100, 200, 400) if count < len(traces)]
+        counts.append(len(traces))
+    rng = np.random.default_rng(seed)
+    rows = []
+    for count in counts:
+        ranks = []
+        h_time = 0.0
+        correlation_time = 0.0
+        for _ in range(n_permutations):
+            subset = rng.permutation(len(traces))[:count]
+            start = perf_counter()
+            h = compute_h(plaintexts[subset], model)
+            h_time += perf_counter() - start
+            start = perf_counter()
+            _, _, correlations = cpa(h, traces[subset])
+            correlation_time += perf_counter() - start
+            ranks.append(key_rank(correlations, key))
+        ranks = np.array(ranks)
+        rows.append({
+            "traces": count,
+            "permutations": n_permutations,
+            "success_rate": float(np.mean(ranks == 1)),
+            "guessing_entropy": float(np.mean(ranks)),
+            "median_rank": float(np.median(ranks)),
+            "max_rank": int(ranks.max()),
+            "load_time": load_time,
+            "h_time": h_time / n_permutations,
+            "correlation_time": correlation_time / n_permutations,
+        })
+    return rows
+
+
+def write_csv(rows: List[Dict[str, float]], file=sys.stdout):
+    """Writes the rows of benchmark() as CSV."""
+    writer = csv.DictWriter(file, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main(args: Optional[Sequence[str]] = None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inputs", default='./traces/inputs_test.dat')
+    parser.add_argument("--traces", default='./traces/T_test.dat')
+    parser.add_argument("--key", type=int, help="correct key, the full set result by default")
+    parser.add_argument("--counts", type=int, nargs="+")
+    parser.add_argument("--permutations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default="hamming_weight")
+    parser.add_argument("--output", help="CSV file, stdout by default")
+    args = parser.parse_args(args)
+    rows = benchmark(args.inputs, args.traces, args.key, args.counts,
+                     args.permutations, args.seed, args.model)
+    if args.output:
+        with open(args.output, "w", newline="") as file:
+            write_csv(rows, file)
+    else:
+        write_csv(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Sequence, Union
+import numpy as np
+
+from attack import compute_h, cpa, key_rank
+from sbox import SBOX
+from trace_store import STORE_EXTENSION, read_trace_store
+from utils import hamming_weight
+
+# Trace matrix of the worker processes, opened once per process as a memmap.
+_TRACES = None
+
+
+class ByteResult(NamedTuple):
+    """Outcome of the CPA on one byte of the key."""
+    position: int
+    key: int
+    rank: Optional[int]
+    coefficient: float
+    sample: int
+    seconds: float
+
+
+def _init_worker(traces_filename: str):
+    """Maps the shared trace matrix in the worker process."""
+    global _TRACES
+    if traces_filename.endswith(STORE_EXTENSION):
+        _, _TRACES = read_trace_store(traces_filename)
+    else:
+        _TRACES = np.load(traces_filename, mmap_mode='r')
+
+
+def attack_byte(position: int, plaintext_bytes: Sequence[int], traces: np.ndarray,
+                correct_key: Optional[int] = None, model: str = "hamming_weight") -> ByteResult:
+    """Runs the CPA on one byte position of the key."""
+    start = perf_counter()
+    h = compute_h(plaintext_bytes, model)
+    key, sample, correlations = cpa(h, traces)
+    rank = None if correct_key is None else key_rank(correlations, correct_key)
+    return ByteResult(position, key, rank, float(abs(correlations[key, sample])),
+                      sample, perf_counter() - start)
+
+
+def _attack_byte_worker(position: int, plaintext_bytes: Sequence[int],
+                        correct_key: Optional[int], model: str) -> ByteResult:
+    return attack_byte(position, plaintext_bytes, _TRACES, correct_key, model)
+
+
+def attack_full_key(plaintexts: np.ndarray, traces: Union[np.ndarray, str],
+                    key: Optional[Sequence[int]] = None,
+                    max_workers: Optional[int] = None,
+                    model: str = "hamming_weight") -> List[ByteResult]:
+    """Recovers the 16 bytes of an AES key with one CPA per byte, in parallel.
+
+    plaintexts is a (n_traces, 16) array, traces either the (n_traces, n_samples)
+    matrix or the path of a .npy file or trace store holding it. The matrix is
+    shared with the workers through a memmap instead of being pickled for every
+    byte. If the key is known, the rank of each of its bytes is reported.
+    """
+    plaintexts = np.asarray(plaintexts, dtype=np.uint8)
+    if plaintexts.ndim != 2 or plaintexts.shape[1] != 16:
+        raise ValueError(f"Expected (n_traces, 16) plaintexts, got {plaintexts.shape}.")
+    with tempfile.TemporaryDirectory() as directory:
+        if isinstance(traces, str):
+            traces_filename = traces
+        else:
+            traces_filename = os.path.join(directory, "traces.npy")
+            np.save(traces_filename, np.asarray(traces))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(traces_filename,)) as executor:
+            futures = [
+                executor.submit(_attack_byte_worker, position,
+                                plaintexts[:, position],
+                                None if key is None else key[position], model)
+                for position in range(16)
+            ]
+            return [future.result() for future in futures]
+
+
+def print_report(results: List[ByteResult]):
+    """Prints the per byte outcome of attack_full_key."""
+    print("byte  key  rank  coefficient  sample  seconds")
+    for result in results:
+        rank = "-" if result.rank is None else result.rank
+        print(f"{result.position:>4}  {result.key:>3}  {rank:>4}  "
+              f"{result.coefficient:>11.4f}  {result.sample:>6}  {result.seconds:>7.3f}")
+
+
+if __name__ == "__main__":
+    # Simulated device leaking the Hamming weight of the 16 SBOX outputs.
+    rng = np.random.default_rng(2255)
+    key = rng.integers(0, 256, 16)
+    plaintexts = rng.integers(0, 256, (2000, 16))
+    leakage = np.array([[hamming_weight(SBOX[p ^ k]) for p, k in zip(row, key)]
+                        for row in plaintexts])
+    traces = np.hstack([leakage, np.zeros((2000, 16))]) + rng.normal(0, 1, (2000, 32))
+    start = perf_counter()
+    results = attack_full_key(plaintexts, traces, key=key)
+    print_report(results)
+    print(f"Total: {perf_counter() - start:.3f}s")
+    assert [result.key for result in results] == key.tolist()
+    assert all(result.rank == 1 for result in results)
@@ -0,0 +1,49 @@
+"""Leakage models of the first round SBOX output, as precomputed tables.
+
+Every model is a 256 x 256 table indexed by [plaintext, key], so the H matrix
+of a whole plaintext vector is a single fancy indexing operation.
+"""
+from typing import Dict, Sequence
+import numpy as np
+
+from sbox import SBOX
+from utils import hamming_weight
+
+HAMMING_WEIGHT = np.array([hamming_weight(byte) for byte in range(256)], dtype=np.uint8)
+
+# SBOX input and output for every (plaintext, key) pair.
+SBOX_INPUT = np.bitwise_xor.outer(np.arange(256, dtype=np.uint8),
+                                  np.arange(256, dtype=np.uint8))
+SBOX_OUTPUT = np.array(SBOX, dtype=np.uint8)[SBOX_INPUT]
+
+LEAKAGE_MODELS: Dict[str, np.ndarray] = {
+    # Hamming weight of the SBOX output.
+    "hamming_weight": HAMMING_WEIGHT[SBOX_OUTPUT],
+    # Hamming distance between the SBOX input and output.
+    "hamming_distance": HAMMING_WEIGHT[SBOX_INPUT ^ SBOX_OUTPUT],
+    # Value of the SBOX output.
+    "identity": SBOX_OUTPUT,
+}
+# Single bit of the SBOX output, bit0 being the least significant one.
+LEAKAGE_MODELS.update({f"bit{bit}": (SBOX_OUTPUT >> bit) & 1 for bit in range(8)})
+
+
+def leakage_table(model: str = "hamming_weight") -> np.ndarray:
+    """Returns the [plaintext, key] table of a leakage model."""
+    try:
+        return LEAKAGE_MODELS[model]
+    except KeyError:
+        raise ValueError(f"Unknown leakage model {model}, "
+                         f"expected one of {', '.join(LEAKAGE_MODELS)}.") from None
+
+
+def compute_h(plaintexts: Sequence[int], model: str = "hamming_weight") -> np.ndarray:
+    """Generates the (n_traces, 256) H matrix of plaintext bytes under a leakage model."""
+    return leakage_table(model)[np.asarray(plaintexts, dtype=np.intp)]
+
+
+if __name__ == "__main__":
+    from aes import encrypt
+    reference = np.array([[encrypt(p, k) for k in range(256)] for p in range(256)])
+    assert (LEAKAGE_MODELS["hamming_weight"] == reference).all()
+    assert compute_h([0, 1], "identity")[1, 1] == SBOX[0]
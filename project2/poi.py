@@ -0,0 +1,133 @@
+"""Points of interest selection, to run the correlation on a few samples only."""
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from attack import compute_h, cpa
+from utils import read_inputs, read_traces
+
+
+class PoiReport(NamedTuple):
+    """Samples kept by the selection and the time it saved.
+
+    Unless it was measured, the time of the full correlation is extrapolated
+    from the cropped one, the correlation cost being linear in the number of
+    samples.
+    """
+    samples: List[int]
+    n_samples: int
+    selection_time: float
+    correlation_time: float
+    estimated_full_time: float
+
+    @property
+    def time_saved(self) -> float:
+        return self.estimated_full_time - self.selection_time - self.correlation_time
+
+
+def class_statistics(traces: np.ndarray, labels: Sequence[int]
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the size, mean trace and variance trace of every class of labels."""
+    _, inverse, counts = np.unique(np.asarray(labels), return_inverse=True, return_counts=True)
+    # Class sums as a product with the (n_classes, n_traces) membership matrix.
+    membership = np.zeros((len(counts), len(inverse)))
+    membership[inverse, np.arange(len(inverse))] = 1
+    traces = np.asarray(traces, dtype=np.float64)
+    means = membership @ traces / counts[:, None]
+    variances = membership @ traces**2 / counts[:, None] - means**2
+    return counts, means, variances
+
+
+def snr(traces: np.ndarray, labels: Sequence[int]) -> np.ndarray:
+    """Signal to noise ratio of every sample, class means variance over mean class variance."""
+    counts, means, variances = class_statistics(traces, labels)
+    signal = np.average((means - np.average(means, axis=0, weights=counts))**2,
+                        axis=0, weights=counts)
+    noise = np.average(variances, axis=0, weights=counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(signal / noise, nan=0.0, posinf=0.0)
+
+
+def sost(traces: np.ndarray, labels: Sequence[int]) -> np.ndarray:
+    """Sum of squared pairwise t-differences between the classes of every sample."""
+    counts, means, variances = class_statistics(traces, labels)
+    # A single trace gives no variance estimate.
+    keep = counts > 1
+    counts, means, variances = counts[keep], means[keep], variances[keep]
+    errors = variances / counts[:, None]
+    result = np.zeros(means.shape[1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(len(counts) - 1):
+            t_squared = (means[i] - means[i + 1:])**2 / (errors[i] + errors[i + 1:])
+            result += np.nan_to_num(t_squared, nan=0.0, posinf=0.0).sum(axis=0)
+    return result
+
+
+METHODS = {"snr": snr, "sost": sost}
+
+
+def select_points_of_interest(traces: np.ndarray, labels: Sequence[int], n_points: int = 10,
+                              method: str = "snr") -> List[int]:
+    """Returns the indices of the n_points samples with the highest score, in order."""
+    try:
+        score = METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown point of interest method {method}, "
+                         f"expected one of {', '.join(METHODS)}.") from None
+    scores = score(traces, labels)
+    return sorted(np.argsort(scores)[::-1][:n_points].tolist())
+
+
+def poi_attack(inputs_filename: str = './traces/inputs_test.dat',
+               traces_filename: str = './traces/T_test.dat',
+               points: Union[int, slice, Sequence[int]] = 10, method: str = "snr",
+               profile_key: Optional[int] = None,
+               model: str = "hamming_weight", n_profiling: Optional[int] = None,
+               measure_full: bool = False) -> Tuple[float, int, PoiReport]:
+    """attack() restricted to points of interest.
+
+    points is either the number of samples to select with method, or a window
+    (slice or indices) given by the user. The selection classes are the leakage
+    classes of profile_key when it is known, the plaintext values otherwise,
+    computed on the first n_profiling traces only if given. With measure_full
+    the correlation is also run on all the samples to report the real time
+    saved.
+    """
+    plaintexts = read_inputs(inputs_filename)
+    traces = read_traces(traces_filename).to_numpy()
+    h = compute_h(plaintexts, model)
+    start = perf_counter()
+    if isinstance(points, int):
+        labels = plaintexts if profile_key is None else h[:, profile_key]
+        samples = select_points_of_interest(traces[:n_profiling], labels[:n_profiling],
+                                            points, method)
+    else:
+        samples = np.arange(traces.shape[1])[points].tolist()
+    selection_time = perf_counter() - start
+    start = perf_counter()
+    key, sample, correlations = cpa(h, traces[:, samples])
+    correlation_time = perf_counter() - start
+    full_time = correlation_time * traces.shape[1] / len(samples)
+    if measure_full:
+        start = perf_counter()
+        cpa(h, traces)
+        full_time = perf_counter() - start
+    report = PoiReport(samples, traces.shape[1], selection_time, correlation_time, full_time)
+    return float(abs(correlations[key, sample])), key, report
+
+
+if __name__ == "__main__":
+    _, key, report = poi_attack(points=5, profile_key=203, measure_full=True)
+    assert key == 203 and 41 in report.samples
+    print(f"Kept samples {report.samples} out of {report.n_samples}, "
+          f"time saved {report.time_saved * 1000:.3f}ms")
+    _, key, _ = poi_attack(points=5, method="sost", profile_key=203, n_profiling=300)
+    assert key == 203
+    _, key, _ = poi_attack(points=slice(35, 50))
+    assert key == 203
+    try:
+        poi_attack(method="foo")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("an unknown method must be rejected")
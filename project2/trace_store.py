@@ -0,0 +1,113 @@
+"""Compact binary trace files.
+
+Layout, all integers little endian:
+    magic          8 bytes, b"TRACES01"
+    n_traces       uint64
+    n_samples      uint64
+    dtype          8 bytes, numpy dtype string of the samples (e.g. b"<f4")
+    width          uint32, number of plaintext bytes per trace
+    plaintexts     n_traces * width uint8
+    padding        up to the next multiple of 64 bytes
+    samples        n_traces * n_samples contiguous row major matrix
+"""
+import struct
+from typing import Tuple
+import numpy as np
+
+from attack import cpa, compute_h
+from utils import iter_traces, read_inputs
+
+STORE_EXTENSION = ".trc"
+MAGIC = b"TRACES01"
+HEADER = struct.Struct("<8sQQ8sI")
+ALIGNMENT = 64
+
+
+def _samples_offset(n_traces: int, width: int) -> int:
+    """Offset of the sample matrix, aligned on ALIGNMENT bytes."""
+    end = HEADER.size + n_traces * width
+    return -(-end // ALIGNMENT) * ALIGNMENT
+
+
+def _write_header(file, plaintexts: np.ndarray, n_samples: int, dtype: np.dtype):
+    """Writes the header and plaintexts, leaves the file at the samples offset."""
+    n_traces = plaintexts.shape[0]
+    width = 1 if plaintexts.ndim == 1 else plaintexts.shape[1]
+    file.write(HEADER.pack(MAGIC, n_traces, n_samples, dtype.str.encode(), width))
+    file.write(np.ascontiguousarray(plaintexts, dtype=np.uint8).tobytes())
+    file.write(b"\0" * (_samples_offset(n_traces, width) - file.tell()))
+
+
+def write_trace_store(filename: str, plaintexts, traces, dtype: str = "float32"):
+    """Writes plaintexts and a (n_traces, n_samples) trace matrix to a store."""
+    dtype = np.dtype(dtype)
+    traces = np.asarray(traces)
+    plaintexts = np.asarray(plaintexts)
+    if plaintexts.shape[0] != traces.shape[0]:
+        raise ValueError(
+            f"{plaintexts.shape[0]} plaintexts for {traces.shape[0]} traces.")
+    with open(filename, "wb") as file:
+        _write_header(file, plaintexts, traces.shape[1], dtype)
+        file.write(np.ascontiguousarray(traces, dtype=dtype).tobytes())
+
+
+def convert(inputs_filename: str = './traces/inputs7.dat',
+            traces_filename: str = './traces/T7.dat',
+            output_filename: str = './traces/T7' + STORE_EXTENSION,
+            dtype: str = "float32", batch_size: int = 1000):
+    """Converts the text inputs and traces files to a store, batch by batch."""
+    dtype = np.dtype(dtype)
+    plaintexts = np.array(read_inputs(inputs_filename), dtype=np.uint8)
+    n_written = 0
+    with open(output_filename, "wb") as file:
+        for batch in iter_traces(traces_filename, batch_size):
+            if n_written == 0:
+                _write_header(file, plaintexts, batch.shape[1], dtype)
+            file.write(np.ascontiguousarray(batch.to_numpy(), dtype=dtype).tobytes())
+            n_written += len(batch)
+    if n_written != len(plaintexts):
+        raise ValueError(
+            f"{len(plaintexts)} plaintexts for {n_written} traces in {traces_filename}.")
+
+
+def read_trace_store(filename: str) -> Tuple[np.ndarray, np.memmap]:
+    """Opens a store, returns its plaintexts and a read-only memmap of the samples."""
+    with open(filename, "rb") as file:
+        magic, n_traces, n_samples, dtype, width = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a trace store.")
+        plaintexts = np.frombuffer(file.read(n_traces * width), dtype=np.uint8)
+    if width > 1:
+        plaintexts = plaintexts.reshape(n_traces, width)
+    traces = np.memmap(filename, dtype=np.dtype(dtype.rstrip(b"\0").decode()), mode="r",
+                       offset=_samples_offset(n_traces, width), shape=(n_traces, n_samples))
+    return plaintexts, traces
+
+
+def attack_trace_store(filename: str, samples: slice = slice(None)) -> Tuple[float, int]:
+    """attack() on a store, only reading the given window of samples."""
+    plaintexts, traces = read_trace_store(filename)
+    key, sample, correlations = cpa(compute_h(plaintexts.tolist()), traces[:, samples])
+    return float(abs(correlations[key, sample])), key
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from time import perf_counter
+    from utils import read_traces
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "T_test" + STORE_EXTENSION)
+        convert('./traces/inputs_test.dat', './traces/T_test.dat', filename, batch_size=128)
+        start = perf_counter()
+        text = read_traces('./traces/T_test.dat')
+        text_time = perf_counter() - start
+        start = perf_counter()
+        plaintexts, traces = read_trace_store(filename)
+        store_time = perf_counter() - start
+        print(f"Text: {os.path.getsize('./traces/T_test.dat')} bytes, loaded in {text_time:.4f}s")
+        print(f"Store: {os.path.getsize(filename)} bytes, opened in {store_time:.4f}s")
+        assert plaintexts.tolist() == read_inputs('./traces/inputs_test.dat')
+        assert np.allclose(traces, text.to_numpy(), atol=1e-6)
+        assert attack_trace_store(filename)[1] == 203
+        assert attack_trace_store(filename, slice(30, 60))[1] == 203
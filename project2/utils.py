@@ -1,3 +1,4 @@
+from typing import Iterator
 import pandas as pd
 
 
@@ -12,6 +13,13 @@ def read_traces(filename: str = './traces/T7.dat') -> pd.DataFrame:
     return pd.read_table(filename, sep=",")
 
 
+def iter_traces(filename: str = './traces/T7.dat', batch_size: int = 100) -> Iterator[pd.DataFrame]:
+    """Read traces by batches of batch_size rows."""
+    with pd.read_table(filename, sep=",", chunksize=batch_size) as reader:
+        for batch in reader:
+            yield batch
+
+
 def hamming_weight(byte: int) -> int:
     """Calculates the hamming weight of a byte, the number of 1 in the binary representation."""
     return bin(byte).count('1')